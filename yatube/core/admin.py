@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Admin class for inspecting background tasks"""
+    list_display = ('pk',
+                    'name',
+                    'status',
+                    'attempts',
+                    'run_at',
+                    'locked_by',)
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created')
+    actions = ('requeue',)
+
+    def requeue(self, request, queryset):
+        queryset.update(status=Task.QUEUED, attempts=0, locked_by='',
+                        locked_at=None, run_at=timezone.now())
+    requeue.short_description = 'Run the selected tasks again'
@@ -0,0 +1,40 @@
+"""Bloom filter: a compact set that may answer false positives but
+never false negatives."""
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Bit array sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(round(-capacity * math.log(error_rate)
+                              / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of a digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        with self._lock:
+            for position in self._positions(item):
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
@@ -0,0 +1,551 @@
+"""Cache backends shared by all worker processes of one host."""
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Last-access times are only rewritten when they are older than this,
+# so hot keys do not turn every read into a write.
+ACCESS_RESOLUTION = 1.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed'
+    ' ON cache_entry (accessed)',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Cache in one SQLite file in WAL mode.
+
+    ``LocMemCache`` gives every gunicorn worker its own cold cache, and
+    invalidations never cross workers. Here readers never block each
+    other and every worker sees the same values, tag versions and
+    counters. Entries carry an absolute expiry time and a last-access
+    time; once the table grows past ``MAX_ENTRIES`` the expired and then
+    the least recently used entries are evicted. ``incr`` runs in a
+    ``BEGIN IMMEDIATE`` transaction and is atomic across processes.
+
+        CACHES = {
+            'shared': {
+                'BACKEND': 'core.cache_backends.SQLiteCache',
+                'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+                'OPTIONS': {'MAX_ENTRIES': 10000},
+            }
+        }
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._timeout_ms = int(
+            params.get('OPTIONS', {}).get('BUSY_TIMEOUT', 5) * 1000)
+
+    @property
+    def _connection(self):
+        # Connections are per thread and are reopened after a fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self._path, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute(f'PRAGMA busy_timeout = {self._timeout_ms}')
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        now = time.time()
+        rows = self._connection.execute(
+            'SELECT key, value, expires, accessed FROM cache_entry '
+            f'WHERE key IN ({", ".join("?" * len(names))})',
+            list(names)
+        ).fetchall()
+        found, stale = {}, []
+        for name, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[names[name]] = pickle.loads(value)
+            if now - accessed > ACCESS_RESOLUTION:
+                stale.append((now, name))
+        if stale:
+            with self._write() as connection:
+                connection.executemany(
+                    'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                    stale)
+        return found
+
+    def _store(self, connection, mode, key, value, timeout):
+        connection.execute(
+            f'INSERT OR {mode} INTO cache_entry '
+            '(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, self._dumps(value), self.get_backend_timeout(timeout),
+             time.time())
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._write() as connection:
+            for key, value in data.items():
+                self._store(connection, 'REPLACE',
+                            self._key(key, version), value, timeout)
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            self._store(connection, 'IGNORE', key, value, timeout)
+            added = connection.execute('SELECT changes()').fetchone()[0]
+            self._cull(connection)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._write() as connection:
+            cursor = connection.execute(
+                'UPDATE cache_entry SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout),
+                 self._key(key, version), time.time())
+            )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache_entry '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, accessed = ? '
+                'WHERE key = ?',
+                (self._dumps(value), time.time(), key))
+        return value
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            'SELECT 1 FROM cache_entry '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        if not names:
+            return
+        with self._write() as connection:
+            connection.execute(
+                'DELETE FROM cache_entry '
+                f'WHERE key IN ({", ".join("?" * len(names))})', names)
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache_entry')
+
+    def _cull(self, connection):
+        count = connection.execute(
+            'SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache_entry WHERE expires <= ?',
+                           (time.time(),))
+        excess = (connection.execute(
+            'SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+            - self._max_entries)
+        if excess > 0:
+            if self._cull_frequency:
+                excess += self._max_entries // self._cull_frequency
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                ' SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (excess,))
+
+    def close(self, **kwargs):
+        # Connections stay open for the life of the worker thread.
+        pass
+
+
+class _Refreshable:
+    """Value stored by ``TieredCache.get_or_set`` with what it takes to
+    refresh it early: the recompute time and the expiry time."""
+
+    __slots__ = ('value', 'delta', 'expires')
+
+    def __init__(self, value, delta, expires):
+        self.value = value
+        self.delta = delta
+        self.expires = expires
+
+    def __getstate__(self):
+        return self.value, self.delta, self.expires
+
+    def __setstate__(self, state):
+        self.value, self.delta, self.expires = state
+
+    def __add__(self, delta):
+        # Lets the L2 ``incr`` shift a wrapped counter atomically.
+        return _Refreshable(self.value + delta, self.delta, self.expires)
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, _Refreshable) else value
+
+
+class _LocalStore:
+    """Process-wide L1 shared by the per-thread backend instances."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.generation = None
+        self.synced = 0.0
+
+
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """In-process LRU (L1) in front of a shared cache (L2).
+
+    * L1 keeps entries for at most ``L1_TIMEOUT`` seconds, bounded by
+      ``MAX_ENTRIES``.
+    * Every write is logged in L2 under an increasing generation number
+      for ``LOG_TIMEOUT`` seconds. Workers replay the log (at request
+      start through ``core.middleware.cache_sync_middleware`` and at
+      most every ``SYNC_INTERVAL`` seconds otherwise) and drop the keys
+      other workers changed; a worker that fell too far behind, or finds
+      entries already gone, clears its L1. Older entries could only
+      name keys whose L1 copies expired anyway, so the log stays small
+      next to the data sharing L2.
+    * ``get_or_set`` recomputes a key once per host: one thread per
+      process waits on a lock and one process per host holds a lock key
+      in L2, while the others wait for its result or keep serving the
+      old value. Values are also refreshed early with probability
+      growing towards expiry (XFetch), so hot keys rarely expire at all.
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'core.cache_backends.TieredCache',
+                'OPTIONS': {'L2': 'shared'},
+            },
+            'shared': {'BACKEND': 'core.cache_backends.SQLiteCache', ...},
+        }
+    """
+
+    log_size = 1000
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._log_timeout = options.get('LOG_TIMEOUT', 30)
+        self._sync_interval = options.get('SYNC_INTERVAL', 0.5)
+        self._beta = options.get('BETA', 1.0)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        with _local_stores_lock:
+            self._store = _local_stores.setdefault(location, _LocalStore())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # L1 ----------------------------------------------------------------
+
+    def _l1_get(self, key):
+        with self._store.lock:
+            entry = self._store.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.time():
+                del self._store.entries[key]
+                return None
+            self._store.entries.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, timeout):
+        lifetime = self._l1_timeout
+        if timeout is not None:
+            lifetime = min(lifetime, timeout)
+        with self._store.lock:
+            entries = self._store.entries
+            entries[key] = (value, time.time() + lifetime)
+            entries.move_to_end(key)
+            while len(entries) > self._max_entries:
+                entries.popitem(last=False)
+
+    def _l1_drop(self, keys):
+        with self._store.lock:
+            for key in keys:
+                self._store.entries.pop(key, None)
+
+    # Invalidation log --------------------------------------------------
+
+    def _publish(self, *keys):
+        l2 = self.l2
+        try:
+            generation = l2.incr('tiered:generation')
+        except ValueError:
+            l2.add('tiered:generation', 0, None)
+            generation = l2.incr('tiered:generation')
+        l2.set(f'tiered:log:{generation}', keys, self._log_timeout)
+        with self._store.lock:
+            if self._store.generation == generation - 1:
+                self._store.generation = generation
+
+    def sync(self, force=False):
+        """Drop L1 keys that other workers changed since the last sync."""
+        store = self._store
+        now = time.time()
+        if not force and now - store.synced < self._sync_interval:
+            return
+        store.synced = now
+        generation = self.l2.get('tiered:generation', 0)
+        seen = store.generation
+        # A generation below the one seen means the log was restarted,
+        # e.g. L2 was cleared or evicted, so nothing in L1 can be trusted.
+        if (seen is None or generation < seen
+                or generation - seen > self.log_size):
+            self._l1_clear(generation)
+            return
+        if generation == seen:
+            return
+        log = self.l2.get_many(
+            [f'tiered:log:{i}' for i in range(seen + 1, generation + 1)])
+        if len(log) < generation - seen:
+            self._l1_clear(generation)
+            return
+        with store.lock:
+            for keys in log.values():
+                if keys == ('*',):
+                    store.entries.clear()
+                for key in keys:
+                    store.entries.pop(key, None)
+            store.generation = max(store.generation or 0, generation)
+
+    def _l1_clear(self, generation):
+        with self._store.lock:
+            self._store.entries.clear()
+            self._store.generation = generation
+
+    # Cache API ---------------------------------------------------------
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _raw_get(self, key):
+        self.sync()
+        value = self._l1_get(key)
+        if value is None:
+            value = self.l2.get(key)
+            if value is not None:
+                self._l1_set(key, value, self._l1_timeout)
+        return value
+
+    def get(self, key, default=None, version=None):
+        value = self._raw_get(self._key(key, version))
+        return default if value is None else _unwrap(value)
+
+    def get_many(self, keys, version=None):
+        self.sync()
+        names = {self._key(key, version): key for key in keys}
+        found, missing = {}, []
+        for name in names:
+            value = self._l1_get(name)
+            if value is None:
+                missing.append(name)
+            else:
+                found[name] = value
+        for name, value in self.l2.get_many(missing).items():
+            self._l1_set(name, value, self._l1_timeout)
+            found[name] = value
+        return {names[name]: _unwrap(value) for name, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout = self.get_backend_timeout(timeout)
+        self.l2.set(key, value, timeout)
+        self._publish(key)
+        self._l1_set(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout = self.get_backend_timeout(timeout)
+        if not self.l2.add(key, value, timeout):
+            return False
+        self._publish(key)
+        self._l1_set(key, value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self.l2.touch(key, self.get_backend_timeout(timeout))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self.l2.incr(key, delta)
+        self._publish(key)
+        self._l1_drop([key])
+        return _unwrap(value)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        self.l2.delete_many(keys)
+        self._publish(*keys)
+        self._l1_drop(keys)
+
+    def has_key(self, key, version=None):
+        return self._raw_get(self._key(key, version)) is not None
+
+    def clear(self):
+        l2 = self.l2
+        generation = l2.get('tiered:generation', 0)
+        l2.clear()
+        # Generations keep growing through the clear, so other workers
+        # replay the '*' entry instead of taking the log for old news.
+        l2.add('tiered:generation', generation, None)
+        self._publish('*')
+        self._l1_clear(l2.get('tiered:generation', 0))
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        key = self._key(key, version)
+        timeout = self.get_backend_timeout(timeout)
+        cached = self._raw_get(key)
+        if cached is not None and not self._should_refresh(cached):
+            return _unwrap(cached)
+        with self._store.lock:
+            flight = self._store.flights.setdefault(key, threading.Lock())
+        with flight:
+            try:
+                return self._refresh(key, default, timeout, cached)
+            finally:
+                with self._store.lock:
+                    self._store.flights.pop(key, None)
+
+    def _refresh(self, key, default, timeout, cached):
+        # Another thread may have finished while this one waited.
+        fresh = self.l2.get(key)
+        if fresh is not None and not self._should_refresh(fresh):
+            self._l1_set(key, fresh, timeout)
+            return _unwrap(fresh)
+        lock_key = f'tiered:lock:{key}'
+        if not self.l2.add(lock_key, 1, self._lock_timeout):
+            if cached is not None:
+                return _unwrap(cached)
+            fresh = self._wait_for(key)
+            if fresh is not None:
+                return _unwrap(fresh)
+            # The holder is slow or gone; its lock still keeps everyone
+            # else waiting, so leave it alone.
+            return self._compute(key, default, timeout)
+        try:
+            return self._compute(key, default, timeout)
+        finally:
+            self.l2.delete(lock_key)
+
+    def _should_refresh(self, cached):
+        if not isinstance(cached, _Refreshable) or cached.expires is None:
+            return False
+        jitter = -cached.delta * self._beta * math.log(random.random())
+        return time.time() + jitter >= cached.expires
+
+    def _wait_for(self, key):
+        deadline = time.time() + self._lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            value = self.l2.get(key)
+            if value is not None:
+                return value
+        return None
+
+    def _compute(self, key, default, timeout):
+        started = time.time()
+        value = default() if callable(default) else default
+        if value is None:
+            return None
+        now = time.time()
+        expires = None if timeout is None else now + timeout
+        entry = _Refreshable(value, now - started, expires)
+        self.l2.set(key, entry, timeout)
+        self._publish(key)
+        self._l1_set(key, entry, timeout)
+        return value
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return timeout
@@ -0,0 +1,81 @@
+"""Tag-based cache invalidation.
+
+Every tag such as ``feed:index`` or ``group:3`` owns a version counter
+in the cache. Keys of tagged entries embed the current versions of all
+their tags, so bumping a tag makes every entry registered under it
+unreachable at once and the stale values simply expire.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def tag_key(tag):
+    return f'tag:{tag}'
+
+
+def _fresh_version():
+    # Time based, so a tag evicted from the cache never comes back with
+    # a version that was already handed out.
+    return int(time.time() * 1000)
+
+
+def get_versions(tags):
+    """Return current versions of ``tags`` with one cache multi-get."""
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*tags):
+    """Invalidate everything registered under any of ``tags``."""
+    for tag in tags:
+        try:
+            cache.incr(tag_key(tag))
+        except ValueError:
+            cache.set(tag_key(tag), _fresh_version(), None)
+
+
+def invalidate(*tags, keys=()):
+    """Bump ``tags`` and delete the cache ``keys`` now and, inside a
+    transaction, once more when it commits.
+
+    The first pass is seen by the transaction itself; the second drops
+    whatever other requests cached from the not yet committed rows
+    meanwhile, which would otherwise stay under the new versions.
+    """
+    def run():
+        bump(*tags)
+        if keys:
+            cache.delete_many(list(keys))
+
+    run()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(run)
+
+
+def drop(*tags):
+    """Invalidate many tags with one cache call.
+
+    The tags come back with fresh versions on their next use; meant for
+    bulk jobs, where bumping each tag would cost a write per tag.
+    """
+    cache.delete_many([tag_key(tag) for tag in tags])
+
+
+def make_key(name, tags, vary_on=()):
+    tags = sorted(set(tags))
+    parts = [*tags, *map(str, get_versions(tags)), *map(str, vary_on)]
+    digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+    return f'tagged.{name}.{digest}'
+
+
+def get_or_set(name, tags, default, timeout=None, vary_on=()):
+    """Cached value of ``default()`` registered under ``tags``."""
+    return cache.get_or_set(make_key(name, tags, vary_on), default, timeout)
@@ -0,0 +1,69 @@
+"""SQLite connection settings and maintenance.
+
+``settings.SQLITE_PRAGMAS`` are applied to every new connection to a
+SQLite database. With WAL readers never wait for the writer, and
+``synchronous = NORMAL`` syncs at checkpoints instead of on every
+commit, which in WAL mode can lose the last transactions on power loss
+but never corrupts the file. The busy timeout makes a second writer
+wait for the lock instead of failing with "database is locked".
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run ``PRAGMA name = value`` for each item of ``pragmas`` on a
+    cursor or a ``sqlite3`` connection."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def file_stats(cursor):
+    return {
+        'size': pragma(cursor, 'page_count') * pragma(cursor, 'page_size'),
+        'free_pages': pragma(cursor, 'freelist_count'),
+    }
+
+
+def maintain(connection, vacuum_pages=None, full=False):
+    """Refresh planner statistics, return free pages to the file system
+    and truncate the WAL; return file stats before and after.
+
+    Free pages are only released when ``auto_vacuum`` is incremental;
+    ``full`` switches it on with a one-off ``VACUUM`` that rewrites the
+    whole file. Must not run inside a transaction.
+    """
+    with connection.cursor() as cursor:
+        before = file_stats(cursor)
+        if full and pragma(cursor, 'auto_vacuum') != 2:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+        cursor.execute('ANALYZE')
+        cursor.execute('PRAGMA optimize')
+        incremental = pragma(cursor, 'auto_vacuum') == 2
+        if incremental:
+            # Every step of the statement frees one page and cursors stop
+            # after the first one; executescript runs it to the end.
+            connection.connection.executescript(
+                f'PRAGMA incremental_vacuum({vacuum_pages or 0})')
+        if pragma(cursor, 'journal_mode') == 'wal':
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return {
+            'before': before,
+            'after': file_stats(cursor),
+            'incremental': incremental,
+        }
@@ -0,0 +1,216 @@
+"""Image processing: normalization of uploads and resized images
+served from signed URLs.
+
+``normalize`` caps the size of an uploaded image and re-encodes it
+without metadata, so nothing downstream decodes a camera original. It
+also returns a tiny inline placeholder shown while the image loads.
+
+``resized_url`` hands out ``/media/r/<sig>/<w>x<h>/<mode>/<name>``
+URLs. The signature covers the size, the mode and the file name, so
+clients cannot ask for arbitrary sizes. The first hit resizes the
+image, later hits serve the file from a disk cache addressed by the
+content of the source image and the requested size.
+"""
+import base64
+import glob
+import hashlib
+import io
+import os
+import tempfile
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from PIL import Image, ImageOps
+
+MODES = ('crop', 'fit')
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+# Longest side of placeholders, in pixels.
+PLACEHOLDER_SIDE = 16
+
+Normalized = namedtuple('Normalized', 'content width height placeholder')
+
+
+def _flatten(image):
+    """Paint transparent areas white; JPEG has no alpha channel."""
+    if image.mode in ('RGBA', 'LA', 'P') and (
+            image.mode != 'P' or 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def placeholder(image):
+    """Return ``image`` shrunk to a few pixels as a JPEG data URI."""
+    image = _flatten(image)
+    image.thumbnail((PLACEHOLDER_SIDE, PLACEHOLDER_SIDE), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=40, optimize=True)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{data}'
+
+
+def normalize(file):
+    """Normalize the uploaded image ``file``.
+
+    The image is turned upright, shrunk to at most
+    ``IMAGE_UPLOAD_MAX_SIDE`` pixels on its longest side and re-encoded
+    as progressive ``IMAGE_UPLOAD_FORMAT`` without EXIF. ``content`` is
+    a ``ContentFile`` named after ``file`` with the new extension, or
+    ``None`` for animations, which are kept as they are.
+    """
+    image = Image.open(file)
+    if getattr(image, 'is_animated', False):
+        size = image.size
+        preview = placeholder(image)
+        file.seek(0)
+        return Normalized(None, *size, preview)
+    max_side = settings.IMAGE_UPLOAD_MAX_SIDE
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    fmt = settings.IMAGE_UPLOAD_FORMAT
+    if fmt == 'JPEG':
+        image = _flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=settings.IMAGE_UPLOAD_QUALITY,
+               optimize=True, progressive=True)
+    name = os.path.splitext(os.path.basename(file.name))[0] + EXTENSIONS[fmt]
+    return Normalized(ContentFile(buffer.getvalue(), name),
+                      image.width, image.height, placeholder(image))
+
+
+def fitted_size(width, height, box_width, box_height, mode):
+    """Size of a ``width`` x ``height`` image resized into the box.
+
+    Images are never upscaled: a crop of a source smaller than the box
+    keeps the box's proportions at the largest size the source covers.
+    """
+    if mode == 'crop':
+        scale = min(width / box_width, height / box_height, 1)
+        return (max(round(box_width * scale), 1),
+                max(round(box_height * scale), 1))
+    scale = min(box_width / width, box_height / height, 1)
+    return max(round(width * scale), 1), max(round(height * scale), 1)
+
+
+def signature(name, width, height, mode):
+    value = f'{name}|{width}x{height}|{mode}'
+    return salted_hmac('core.images', value).hexdigest()[:16]
+
+
+def check_signature(sig, name, width, height, mode):
+    return constant_time_compare(sig, signature(name, width, height, mode))
+
+
+def resized_url(name, width, height, mode):
+    return reverse('resized_image', kwargs={
+        'sig': signature(name, width, height, mode),
+        'width': width,
+        'height': height,
+        'mode': mode,
+        'name': name,
+    })
+
+
+def digest_key(name):
+    return f'images:digest:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def file_digest(source):
+    sha = hashlib.sha1()
+    for chunk in iter(lambda: source.read(64 * 1024), b''):
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def content_digest(name):
+    """SHA-1 of the stored file ``name``, remembered in the cache.
+
+    Stored files are never overwritten, so the digest of a name does not
+    change.
+    """
+    key = digest_key(name)
+    digest = cache.get(key)
+    if digest is None:
+        with default_storage.open(name) as source:
+            digest = file_digest(source)
+        cache.set(key, digest, None)
+    return digest
+
+
+def cache_path(digest, width, height, mode):
+    return os.path.join(settings.IMAGE_RESIZE_ROOT, digest[:2],
+                        f'{digest}-{width}x{height}-{mode}.jpg')
+
+
+def forget(name, path=None):
+    """Drop the remembered digest of the deleted file ``name`` and every
+    rendition of it; ``path`` is where its content can still be read
+    when the digest is no longer cached."""
+    key = digest_key(name)
+    digest = cache.get(key)
+    if digest is None and path is not None:
+        with open(path, 'rb') as source:
+            digest = file_digest(source)
+    cache.delete(key)
+    if digest is None:
+        return
+    pattern = os.path.join(settings.IMAGE_RESIZE_ROOT, digest[:2],
+                           f'{digest}-*')
+    for rendition in glob.glob(pattern):
+        try:
+            os.remove(rendition)
+        except FileNotFoundError:
+            pass
+
+
+def resize(source, width, height, mode):
+    """Return ``source`` resized into ``width`` x ``height``.
+
+    ``'crop'`` fills the box and cuts off the overflow around the
+    center, ``'fit'`` keeps the whole image inside the box; neither
+    upscales (see ``fitted_size``). JPEGs are decoded straight at the
+    smallest scale that still covers the box.
+    """
+    image = Image.open(source)
+    image.draft('RGB', (width, height))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    if mode == 'crop':
+        size = fitted_size(*image.size, width, height, mode)
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def get_resized(name, width, height, mode):
+    """Return the path of the cached rendition, creating it if needed."""
+    digest = content_digest(name)
+    path = cache_path(digest, width, height, mode)
+    if os.path.exists(path):
+        # Renditions may outlive a deleted source for a moment.
+        if not default_storage.exists(name):
+            raise FileNotFoundError(name)
+    else:
+        with default_storage.open(name) as source:
+            image = resize(source, width, height, mode)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename, so concurrent hits never see a half
+        # written file.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as target:
+            image.save(target, 'JPEG', quality=settings.IMAGE_RESIZE_QUALITY,
+                       optimize=True, progressive=True)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    return path
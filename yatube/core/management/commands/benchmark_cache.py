@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+PAYLOAD = {'html': 'x' * 2048, 'ids': list(range(50))}
+
+
+def run_ops(cache, operations, keys):
+    started = time.perf_counter()
+    for i in range(operations):
+        key = f'key{i % keys}'
+        if i % 10 == 0:
+            cache.set(key, PAYLOAD)
+        elif i % 10 == 1:
+            cache.incr('counter')
+        else:
+            cache.get(key)
+    return time.perf_counter() - started
+
+
+def sqlite_worker(path, operations, keys, queue):
+    queue.put(run_ops(SQLiteCache(path, {}), operations, keys))
+
+
+class Command(BaseCommand):
+    help = ('Compare the shared SQLite cache with LocMemCache on a '
+            '80% get / 10% set / 10% incr mix.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=20000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def report(self, name, operations, elapsed):
+        self.stdout.write(f'{name:>24}: {operations / elapsed:10.0f} ops/s')
+
+    def handle(self, *args, **options):
+        operations, keys = options['operations'], options['keys']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            for name, cache in (
+                    ('locmem', LocMemCache('benchmark', {})),
+                    ('sqlite', SQLiteCache(path, {}))):
+                cache.set('counter', 0)
+                self.report(name, operations,
+                            run_ops(cache, operations, keys))
+
+            # LocMemCache cannot be shared, so only SQLite gets this run.
+            workers = options['workers']
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            started = time.perf_counter()
+            processes = [
+                context.Process(target=sqlite_worker,
+                                args=(path, operations, keys, queue))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            self.report(f'sqlite x{workers} processes',
+                        operations * workers,
+                        time.perf_counter() - started)
+            counter = SQLiteCache(path, {}).get('counter')
+            self.stdout.write(f'shared counter after the run: {counter}')
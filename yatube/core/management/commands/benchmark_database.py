@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+AUTHORS = 100
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL,'
+    ' pub_date REAL NOT NULL, text TEXT NOT NULL)',
+    'CREATE INDEX post_author_pub_date ON post (author_id, pub_date)',
+)
+
+# A profile page: the newest posts of an author and their count.
+READS = (
+    'SELECT id, pub_date, text FROM post WHERE author_id = ?'
+    ' ORDER BY pub_date DESC, id DESC LIMIT 10',
+    'SELECT COUNT(*) FROM post WHERE author_id = ?',
+)
+
+WRITE = 'INSERT INTO post (author_id, pub_date, text) VALUES (?, ?, ?)'
+
+# Pragmas and whether a connection serves more than one request.
+PROFILES = {
+    'default': ({}, False),
+    'production': (settings.SQLITE_PRAGMAS, True),
+}
+
+
+def request(connection, role, rng):
+    author_id = rng.randrange(AUTHORS)
+    if role == 'read':
+        for query in READS:
+            connection.execute(query, (author_id,)).fetchall()
+        return
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(WRITE, (author_id, time.time(), 'x' * 200))
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def worker(path, profile, role, seconds, queue):
+    pragmas, persistent = PROFILES[profile]
+    rng = random.Random(os.getpid())
+    connection = None
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if connection is None:
+            connection = sqlite3.connect(path, isolation_level=None)
+            apply_pragmas(connection, pragmas)
+        try:
+            request(connection, role, rng)
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+        if not persistent:
+            connection.close()
+            connection = None
+    queue.put((role, done, errors))
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent read/write throughput of SQLite with '
+            'default settings, reconnecting per request, and with '
+            'SQLITE_PRAGMAS over persistent connections.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=50000,
+                            help='Rows created before each run.')
+
+    def populate(self, path, posts):
+        connection = sqlite3.connect(path)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.executemany(WRITE, (
+            (i % AUTHORS, now - i, 'x' * 200) for i in range(posts)))
+        connection.commit()
+        connection.close()
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        roles = (['read'] * options['readers']
+                 + ['write'] * options['writers'])
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in PROFILES:
+                path = os.path.join(directory, f'{profile}.sqlite3')
+                self.populate(path, options['posts'])
+                queue = context.Queue()
+                processes = [
+                    context.Process(target=worker,
+                                    args=(path, profile, role, seconds,
+                                          queue))
+                    for role in roles
+                ]
+                for process in processes:
+                    process.start()
+                totals = {'read': [0, 0], 'write': [0, 0]}
+                for _ in processes:
+                    role, done, errors = queue.get()
+                    totals[role][0] += done
+                    totals[role][1] += errors
+                for process in processes:
+                    process.join()
+                self.stdout.write(
+                    f'{profile:>10}: '
+                    f'{totals["read"][0] / seconds:8.0f} reads/s, '
+                    f'{totals["write"][0] / seconds:8.0f} writes/s, '
+                    f'{totals["read"][1] + totals["write"][1]} errors')
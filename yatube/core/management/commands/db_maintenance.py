@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import db
+
+
+class Command(BaseCommand):
+    help = ('Refresh SQLite planner statistics, release free pages with '
+            'an incremental vacuum and truncate the WAL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--pages', type=int, default=0,
+                            help='Free pages to release; 0 releases all.')
+        parser.add_argument('--full', action='store_true',
+                            help='Enable incremental auto_vacuum with a '
+                                 'one-off VACUUM of the whole file.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Only SQLite databases are supported.')
+        stats = db.maintain(connection, options['pages'], options['full'])
+        if not stats['incremental']:
+            self.stderr.write('auto_vacuum is not incremental, so no pages '
+                              'were released; run once with --full.')
+        for moment in ('before', 'after'):
+            self.stdout.write(
+                f'{moment:>6}: {stats[moment]["size"] / 2 ** 20:.1f} MiB, '
+                f'{stats[moment]["free_pages"]} free pages')
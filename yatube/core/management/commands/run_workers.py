@@ -0,0 +1,39 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = ('Run queued background tasks in a pool of threads until '
+            'interrupted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Worker threads; 1 runs in this thread.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds an idle worker waits for tasks.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the due tasks and exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = tasks.run_pending()
+            self.stdout.write(f'Ran {count} tasks.')
+            return
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        workers = options['workers']
+        self.stdout.write(f'Running {workers} workers.')
+        if workers == 1:
+            tasks.work(tasks.worker_name(), stop, options['poll'])
+            return
+        with ThreadPoolExecutor(workers,
+                                thread_name_prefix='tasks') as pool:
+            for index in range(workers):
+                pool.submit(tasks.work, tasks.worker_name(index), stop,
+                            options['poll'])
@@ -0,0 +1,13 @@
+from django.core.cache import cache
+
+
+def cache_sync_middleware(get_response):
+    """Drop L1 cache entries changed by other workers before each request,
+    so a request never mixes fresh and stale values."""
+    def middleware(request):
+        sync = getattr(cache, 'sync', None)
+        if sync is not None:
+            sync(force=True)
+        return get_response(request)
+
+    return middleware
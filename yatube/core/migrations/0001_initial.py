@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Dotted path of the task function', max_length=200, verbose_name='Task')),
+                ('arguments', models.TextField(help_text='JSON list of args and kwargs', verbose_name='Arguments')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('max_attempts', models.PositiveIntegerField(verbose_name='Max attempts')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Run at')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Claimed at')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+            ],
+            options={
+                'verbose_name': 'Task',
+                'verbose_name_plural': 'Tasks',
+                'ordering': ('run_at',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='core_task_status_run_at'),
+        ),
+    ]
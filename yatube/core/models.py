@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Call of a function registered with ``core.tasks.task``, waiting
+    for ``manage.py run_workers``"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=200,
+                            verbose_name='Task',
+                            help_text='Dotted path of the task function')
+    arguments = models.TextField(verbose_name='Arguments',
+                                 help_text='JSON list of args and kwargs')
+    status = models.CharField(max_length=10,
+                              choices=STATUSES,
+                              default=QUEUED,
+                              verbose_name='Status')
+    attempts = models.PositiveIntegerField(default=0,
+                                           verbose_name='Attempts')
+    max_attempts = models.PositiveIntegerField(verbose_name='Max attempts')
+    run_at = models.DateTimeField(default=timezone.now,
+                                  verbose_name='Run at')
+    locked_by = models.CharField(max_length=100,
+                                 blank=True,
+                                 verbose_name='Worker')
+    locked_at = models.DateTimeField(null=True,
+                                     blank=True,
+                                     verbose_name='Claimed at')
+    last_error = models.TextField(blank=True,
+                                  verbose_name='Last error')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Created')
+
+    class Meta:
+        ordering = ('run_at',)
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='core_task_status_run_at'),
+        ]
+        verbose_name = 'Task'
+        verbose_name_plural = 'Tasks'
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
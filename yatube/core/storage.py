@@ -0,0 +1,79 @@
+import hashlib
+import os
+import tempfile
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that keeps every distinct content once.
+
+    Uploads are hashed while they are streamed to disk and stored as
+    ``<upload_to>/<sha[:2]>/<sha256><ext>``, so identical files end up
+    under one name and share everything keyed by it (thumbnails,
+    resized copies). A name may be referenced by many rows; deleting
+    the file once the last one goes is up to the caller.
+
+    An upload that finds its content already stored refreshes the
+    file's modification time, and writes the file anew if it is gone
+    by then. So a caller that moves a file out of the way with
+    ``set_aside`` learns from the returned time whether an upload may
+    still be about to reference it.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known after hashing, see _save().
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+        sha = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.path(directory))
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    target.write(chunk)
+            digest = sha.hexdigest()
+            ext = os.path.splitext(basename)[1].lower()
+            name = os.path.join(directory, digest[:2], digest + ext)
+            path = self.path(name)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp, self.file_permissions_mode or 0o644)
+                # Concurrent uploads of the same content write the same
+                # bytes, so whichever rename wins is fine.
+                os.replace(tmp, path)
+            else:
+                os.remove(tmp)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return name.replace('\\', '/')
+
+    def set_aside(self, name):
+        """Move the file ``name`` to a private path and return that path
+        with the time the file was last stored or reused, or ``None`` if
+        there is no such file."""
+        path = self.path(name)
+        aside = f'{path}.{uuid.uuid4().hex}.aside'
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:
+            return None
+        return aside, os.path.getmtime(aside)
+
+    def put_back(self, name, aside):
+        """Undo ``set_aside``, unless an upload stored the file again."""
+        try:
+            os.link(aside, self.path(name))
+        except FileExistsError:
+            pass
+        os.remove(aside)
@@ -0,0 +1,175 @@
+"""Background tasks stored in the database.
+
+``@task`` registers a function; ``func.enqueue(*args, **kwargs)`` saves
+the call as a ``core.models.Task`` row in the current transaction, so a
+task of a rolled back request never runs and workers never see the
+data it needs before it is committed. ``manage.py run_workers`` runs
+the queue. Arguments go through JSON.
+
+A worker claims a task with a single conditional ``UPDATE`` that only
+matches the row as it was read; of several workers racing for a row
+exactly one updates it, which holds under SQLite's database-wide write
+lock as well as under row locking databases. Failed calls are retried
+with exponential backoff until ``max_attempts``; tasks of a worker that
+died are claimed again once their lease runs out, or marked failed if
+that was their last attempt. Bookkeeping writes that hit a locked
+database are retried, and a worker thread survives any error.
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """Function that can also be enqueued."""
+
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return self.enqueue_in(0, *args, **kwargs)
+
+    def enqueue_in(self, delay, *args, **kwargs):
+        """Enqueue a call that is due ``delay`` seconds from now."""
+        return Task.objects.create(
+            name=self.name,
+            arguments=json.dumps([args, kwargs]),
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+
+
+def task(func=None, *, max_attempts=None):
+    """Decorator registering ``func`` as a task."""
+    def decorate(func):
+        return TaskFunction(func, max_attempts or settings.TASKS_MAX_ATTEMPTS)
+    return decorate(func) if func is not None else decorate
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def retry_delay(attempts):
+    """Seconds to wait before attempt number ``attempts + 1``."""
+    return min(settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1),
+               settings.TASKS_MAX_RETRY_DELAY)
+
+
+def retrying(write, attempts=5, delay=0.1):
+    """Call ``write`` until it gets past SQLite's "database is locked"."""
+    for attempt in range(attempts):
+        try:
+            return write()
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            logger.warning('Database busy, retrying task bookkeeping')
+            time.sleep(delay * 2 ** attempt)
+
+
+def fail_expired(lease):
+    """Mark tasks whose lease ran out on their last attempt as failed."""
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=lease,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Task.FAILED,
+             last_error='Lease expired on the last attempt.')
+
+
+def claim(worker):
+    """Mark the next due task as run by ``worker`` and return it."""
+    now = timezone.now()
+    lease = now - timedelta(seconds=settings.TASKS_LEASE)
+    fail_expired(lease)
+    candidates = Task.objects.filter(
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_at__lt=lease,
+            attempts__lt=F('max_attempts'))
+    ).values_list('pk', 'status', 'attempts')[:settings.TASKS_CLAIM_BATCH]
+    for pk, status, attempts in candidates:
+        claimed = Task.objects.filter(
+            pk=pk, status=status, attempts=attempts,
+        ).update(status=Task.RUNNING, attempts=attempts + 1,
+                 locked_by=worker, locked_at=now)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Run the claimed ``job``; return whether it succeeded."""
+    try:
+        args, kwargs = json.loads(job.arguments)
+        import_string(job.name)(*args, **kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Task %s #%s failed', job.name, job.pk)
+        if job.attempts < job.max_attempts:
+            retrying(lambda: Task.objects.filter(pk=job.pk).update(
+                status=Task.QUEUED, locked_by='', locked_at=None,
+                last_error=error,
+                run_at=timezone.now() + timedelta(
+                    seconds=retry_delay(job.attempts)),
+            ))
+        else:
+            retrying(lambda: Task.objects.filter(pk=job.pk).update(
+                status=Task.FAILED, last_error=error))
+        return False
+    retrying(lambda: Task.objects.filter(pk=job.pk).delete())
+    return True
+
+
+def run_pending(worker=None):
+    """Run due tasks until none is left and return how many ran."""
+    worker = worker or worker_name()
+    count = 0
+    job = claim(worker)
+    while job is not None:
+        execute(job)
+        count += 1
+        job = claim(worker)
+    return count
+
+
+def work(worker, stop, poll):
+    """Run tasks until the event ``stop`` is set."""
+    try:
+        while not stop.is_set():
+            try:
+                job = claim(worker)
+                if job is not None:
+                    execute(job)
+            except OperationalError:
+                # SQLite gave up waiting for another writer's lock; a
+                # task left running is claimed again after its lease.
+                logger.warning('Worker %s hit a locked database', worker,
+                               exc_info=True)
+                job = None
+            except Exception:
+                logger.exception('Worker %s failed', worker)
+                job = None
+            if job is None:
+                stop.wait(poll)
+    finally:
+        connections.close_all()
@@ -0,0 +1,54 @@
+from django import template
+
+from core import cache_tags
+
+register = template.Library()
+
+
+class TaggedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, tags, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.tags = tags
+        self.vary_on = vary_on
+
+    def render(self, context):
+        tags = self.tags.resolve(context)
+        if isinstance(tags, str):
+            tags = tags.split()
+        return cache_tags.get_or_set(
+            f'template.{self.name}',
+            tags,
+            lambda: self.nodelist.render(context),
+            timeout=self.timeout.resolve(context),
+            vary_on=[var.resolve(context) for var in self.vary_on],
+        )
+
+
+@register.tag
+def tagcache(parser, token):
+    """Cache a fragment until its timeout or until one of its tags is
+    bumped.
+
+    Usage::
+
+        {% tagcache 300 fragment_name tags [var1 var2 ...] %}
+        ...
+        {% endtagcache %}
+
+    ``tags`` resolves to a list or to a space-separated string.
+    """
+    nodelist = parser.parse(('endtagcache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 3 arguments.")
+    return TaggedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        parser.compile_filter(bits[3]),
+        [parser.compile_filter(bit) for bit in bits[4:]],
+    )
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+
+from core.bloom import BloomFilter
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        names = [f'user{i}' for i in range(1000)]
+        bloom.update(names)
+        self.assertTrue(all(name in bloom for name in names))
+        self.assertEqual(bloom.count, 1000)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        bloom.update(f'user{i}' for i in range(1000))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_empty(self):
+        self.assertNotIn('anyone', BloomFilter(0))
@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache_backends import SQLiteCache, TieredCache
+
+
+def bump_counter(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 5}})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_tests_do_not_share_the_development_cache(self):
+        location = caches['shared']._path
+        self.assertFalse(location.startswith(settings.BASE_DIR))
+        self.assertEqual(location, settings.CACHE_PATH)
+
+    def test_set_get_delete(self):
+        """Values round-trip and can be deleted."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertEqual(self.cache.get_many(['key', 'missing']),
+                         {'key': {'value': [1, 2]}})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expiry_and_add(self):
+        """Expired entries are invisible and can be re-added."""
+        self.cache.set('key', 'old', 0.05)
+        self.assertFalse(self.cache.add('key', 'new'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_lru_eviction(self):
+        """Least recently used entries go first once the cache is full."""
+        for i in range(5):
+            self.cache.set(f'key{i}', i)
+        self.cache._connection.execute(
+            'UPDATE cache_entry SET accessed = accessed - 10')
+        self.cache.get('key0')
+        self.cache.set('key5', 5)
+        self.assertEqual(self.cache.get('key0'), 0)
+        self.assertIsNone(self.cache.get('key1'))
+        self.assertEqual(self.cache.get('key5'), 5)
+
+    def test_incr_is_shared_and_atomic(self):
+        """Concurrent incr from several processes loses no update."""
+        self.cache.set('counter', 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=bump_counter,
+                                   args=(self.path, 50))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'core.cache_backends.SQLiteCache',
+                'LOCATION': os.path.join(self.directory, 'cache.sqlite3'),
+            },
+        })
+        self.settings.enable()
+        # Two L1 stores stand for two worker processes.
+        self.worker = TieredCache(f'{self.directory}-1', {})
+        self.other_worker = TieredCache(f'{self.directory}-2', {})
+        self.worker.sync(force=True)
+        self.other_worker.sync(force=True)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_l1_serves_repeated_reads(self):
+        """Second read comes from L1 even if L2 lost the entry."""
+        self.worker.set('key', 'value')
+        self.worker.l2.clear()
+        self.assertEqual(self.worker.get('key'), 'value')
+
+    def test_writes_invalidate_other_workers(self):
+        """Writes of one worker drop stale L1 copies of the others."""
+        self.worker.set('key', 'old')
+        self.assertEqual(self.other_worker.get('key'), 'old')
+        self.worker.set('key', 'new')
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 'new')
+        self.worker.set('counter', 1)
+        self.other_worker.get('counter')
+        self.worker.incr('counter')
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('counter'), 2)
+        self.worker.delete('key')
+        self.other_worker.sync(force=True)
+        self.assertIsNone(self.other_worker.get('key'))
+
+    def test_invalidation_survives_clear(self):
+        for i in range(5):
+            self.worker.set('key', i)
+        self.worker.clear()
+        self.worker.set('key', 'old')
+        self.assertEqual(self.other_worker.get('key'), 'old')
+        self.other_worker.set('key', 'new')
+        self.worker.sync(force=True)
+        self.assertEqual(self.worker.get('key'), 'new')
+
+    def test_clear_reaches_workers_ahead_of_generation_zero(self):
+        for i in range(5):
+            self.worker.set('key', i)
+        self.worker.set('key', 'old')
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 'old')
+        self.assertGreater(self.other_worker._store.generation, 0)
+        self.worker.clear()
+        self.worker.set('key', 'new')
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 'new')
+
+    def test_restarted_log_clears_l1(self):
+        for i in range(5):
+            self.worker.set('key', i)
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 4)
+        self.assertGreater(self.other_worker._store.generation, 0)
+        # The shared cache lost everything, generation counter included.
+        self.worker.l2.clear()
+        self.worker.l2.set(self.worker.make_key('key'), 'new')
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 'new')
+
+    def test_get_or_set_single_flight(self):
+        """Concurrent misses on one key recompute it only once."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(
+                self.worker.get_or_set('key', compute, 60)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_timed_out_wait_leaves_the_lock_to_its_holder(self):
+        worker = TieredCache(f'{self.directory}-3',
+                             {'OPTIONS': {'LOCK_TIMEOUT': 0.1}})
+        key = worker.make_key('key')
+        # Another process is still computing the key.
+        worker.l2.add(f'tiered:lock:{key}', 1, 60)
+        self.assertEqual(worker.get_or_set('key', lambda: 'value', 60),
+                         'value')
+        self.assertIsNotNone(worker.l2.get(f'tiered:lock:{key}'))
+
+    def test_log_entries_expire_soon(self):
+        worker = TieredCache(f'{self.directory}-3',
+                             {'OPTIONS': {'LOG_TIMEOUT': 0.1}})
+        worker.set('key', 'value')
+        generation = worker.l2.get('tiered:generation')
+        self.assertIsNotNone(worker.l2.get(f'tiered:log:{generation}'))
+        time.sleep(0.2)
+        self.assertIsNone(worker.l2.get(f'tiered:log:{generation}'))
+        self.other_worker.sync(force=True)
+        self.assertEqual(self.other_worker.get('key'), 'value')
+
+    def test_get_or_set_refreshes_early(self):
+        """Entries close to expiry are recomputed before they expire."""
+
+        def compute():
+            # A measurable recompute time, so the early refresh is certain.
+            time.sleep(0.01)
+            return 'old'
+
+        self.worker.get_or_set('key', compute, 60)
+        self.assertEqual(self.worker.get_or_set('key', lambda: 'new', 60),
+                         'old')
+        worker = TieredCache(f'{self.directory}-3',
+                             {'OPTIONS': {'BETA': 10 ** 9}})
+        self.assertEqual(worker.get_or_set('key', lambda: 'new', 60), 'new')
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase
+
+from core import db
+
+
+class FileDatabaseTests(SimpleTestCase):
+    """Pragmas and maintenance on a database file of its own."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+        })
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_new_connections_get_pragmas(self):
+        with self.database.cursor() as cursor:
+            self.assertEqual(db.pragma(cursor, 'journal_mode'), 'wal')
+            self.assertEqual(db.pragma(cursor, 'synchronous'), 1)
+            self.assertEqual(db.pragma(cursor, 'busy_timeout'), 5000)
+            self.assertEqual(db.pragma(cursor, 'cache_size'), -65536)
+
+    def fill_and_empty(self):
+        with self.database.cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS item (value TEXT)')
+            for _ in range(200):
+                cursor.execute('INSERT INTO item VALUES (?)', ['x' * 1000])
+            cursor.execute('DELETE FROM item')
+            return db.file_stats(cursor)
+
+    def test_maintain_releases_free_pages(self):
+        filled = self.fill_and_empty()
+        self.assertGreater(filled['free_pages'], 0)
+        stats = db.maintain(self.database)
+        self.assertFalse(stats['incremental'])
+        self.assertGreater(stats['after']['free_pages'], 0)
+
+        stats = db.maintain(self.database, full=True)
+        self.assertTrue(stats['incremental'])
+        self.assertEqual(stats['after']['free_pages'], 0)
+        self.assertLess(stats['after']['size'], filled['size'])
+
+        filled = self.fill_and_empty()
+        stats = db.maintain(self.database, vacuum_pages=10)
+        self.assertGreater(stats['after']['free_pages'], 0)
+        self.assertLess(stats['after']['free_pages'], filled['free_pages'])
+        stats = db.maintain(self.database)
+        self.assertEqual(stats['after']['free_pages'], 0)
+        with self.database.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master "
+                           "WHERE name = 'sqlite_stat1'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class MaintenanceCommandTests(TestCase):
+    def test_reports_file_stats(self):
+        out, err = StringIO(), StringIO()
+        call_command('db_maintenance', stdout=out, stderr=err)
+        self.assertIn('before', out.getvalue())
+        self.assertIn('after', out.getvalue())
+        self.assertIn('--full', err.getvalue())
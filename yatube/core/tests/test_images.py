@@ -0,0 +1,102 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+
+from core import images
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   IMAGE_RESIZE_ROOT=os.path.join(TEMP_MEDIA_ROOT, 'resized'))
+class ResizedImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(buffer, 'JPEG')
+        cls.name = default_storage.save('posts/photo.jpg',
+                                        ContentFile(buffer.getvalue()))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def open_image(self, response):
+        return Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_signed_url_serves_resized_image(self):
+        for mode, size in (('crop', (960, 339)), ('fit', (452, 339))):
+            with self.subTest(mode=mode):
+                response = self.client.get(
+                    images.resized_url(self.name, 960, 339, mode))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'image/jpeg')
+                self.assertIn('max-age=31536000', response['Cache-Control'])
+                self.assertEqual(self.open_image(response).size, size)
+
+    def test_small_images_are_not_upscaled(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'JPEG')
+        name = default_storage.save('posts/small.jpg',
+                                    ContentFile(buffer.getvalue()))
+        for mode, size in (('crop', (400, 141)), ('fit', (400, 300))):
+            with self.subTest(mode=mode):
+                response = self.client.get(
+                    images.resized_url(name, 960, 339, mode))
+                self.assertEqual(self.open_image(response).size, size)
+                self.assertEqual(
+                    images.fitted_size(400, 300, 960, 339, mode), size)
+
+    def test_unsigned_sizes_are_refused(self):
+        url = images.resized_url(self.name, 960, 339, 'crop')
+        for forged in (url.replace('960x339', '961x339'),
+                       url.replace('/crop/', '/fit/'),
+                       url.replace('photo', 'other')):
+            with self.subTest(url=forged):
+                self.assertEqual(self.client.get(forged).status_code, 404)
+
+    def test_later_hits_are_served_from_disk(self):
+        url = images.resized_url(self.name, 320, 240, 'crop')
+        self.client.get(url)
+        with mock.patch.object(images, 'resize') as resize:
+            response = self.client.get(url)
+        resize.assert_not_called()
+        self.assertEqual(self.open_image(response).size, (320, 240))
+
+    def test_renditions_of_deleted_files_are_not_served(self):
+        with default_storage.open(self.name) as source:
+            copy = default_storage.save('posts/gone.jpg', source)
+        url = images.resized_url(copy, 120, 90, 'fit')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        default_storage.delete(copy)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_same_content_shares_the_cache(self):
+        with default_storage.open(self.name) as source:
+            copy = default_storage.save('posts/copy.jpg', source)
+        self.assertEqual(images.get_resized(self.name, 100, 100, 'fit'),
+                         images.get_resized(copy, 100, 100, 'fit'))
+
+    @override_settings(IMAGE_RESIZE_ACCEL_REDIRECT='/internal/resized/')
+    def test_accel_redirect(self):
+        response = self.client.get(
+            images.resized_url(self.name, 200, 200, 'fit'))
+        digest = images.content_digest(self.name)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/internal/resized/{digest[:2]}/'
+                         f'{digest}-200x200-fit.jpg')
@@ -0,0 +1,134 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task
+def record(value, key=None):
+    calls.append((value, key))
+
+
+@tasks.task(max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(TASKS_RETRY_DELAY=10, TASKS_MAX_RETRY_DELAY=25,
+                   TASKS_LEASE=60)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        record.enqueue(1, key='a')
+        record.enqueue([2, 3])
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertEqual(calls, [(1, 'a'), ([2, 3], None)])
+        self.assertFalse(Task.objects.exists())
+
+    def test_decorated_function_stays_callable(self):
+        record(4)
+        self.assertEqual(calls, [(4, None)])
+
+    def test_retry_with_backoff_then_fail(self):
+        job = fail.enqueue()
+        self.assertEqual(tasks.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.QUEUED, 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertIsNone(tasks.claim('worker'))
+
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual([tasks.retry_delay(n) for n in (1, 2, 3, 4)],
+                         [10, 20, 25, 25])
+
+    def test_claim_is_exclusive(self):
+        job = record.enqueue(1)
+        stale = Task.objects.filter(pk=job.pk).values_list(
+            'pk', 'status', 'attempts')
+        self.assertEqual(tasks.claim('first').pk, job.pk)
+        # A worker that read the row before the claim loses the race.
+        with mock.patch.object(Task.objects, 'filter',
+                               side_effect=[Task.objects.none(), stale,
+                                            Task.objects.filter(
+                                                pk=job.pk,
+                                                status=Task.QUEUED,
+                                                attempts=0)]):
+            self.assertIsNone(tasks.claim('second'))
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('first', 1))
+
+    def test_expired_lease_is_claimed_again(self):
+        job = record.enqueue(1)
+        tasks.claim('dead')
+        self.assertIsNone(tasks.claim('alive'))
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(tasks.claim('alive').pk, job.pk)
+
+    def test_expired_last_attempt_is_failed(self):
+        job = fail.enqueue()
+        Task.objects.update(attempts=2, status=Task.RUNNING,
+                            locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertIsNone(tasks.claim('alive'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertIn('Lease expired', job.last_error)
+
+    def test_bookkeeping_retries_locked_database(self):
+        results = [OperationalError('database is locked'), 'done']
+
+        def write():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch('core.tasks.time.sleep') as sleep:
+            self.assertEqual(tasks.retrying(write), 'done')
+        sleep.assert_called_once()
+
+    def test_worker_survives_errors(self):
+        record.enqueue(6)
+        stop = threading.Event()
+        errors = [OperationalError('database is locked'), RuntimeError()]
+        run = tasks.execute
+
+        def execute(job):
+            if errors:
+                raise errors.pop(0)
+            run(job)
+            stop.set()
+
+        Task.objects.update(run_at=timezone.now())
+        with mock.patch('core.tasks.execute', side_effect=execute), \
+                mock.patch('core.tasks.connections.close_all'), \
+                mock.patch.object(stop, 'wait', side_effect=lambda poll: (
+                    Task.objects.update(status=Task.QUEUED, locked_at=None,
+                                        attempts=0))):
+            tasks.work('worker', stop, 0)
+        self.assertEqual(calls, [(6, None)])
+
+    def test_run_workers_once(self):
+        record.enqueue(5)
+        out = StringIO()
+        call_command('run_workers', once=True, stdout=out)
+        self.assertEqual(calls, [(5, None)])
+        self.assertIn('Ran 1 tasks.', out.getvalue())
@@ -1,4 +1,12 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from core import images
 
 
 def page_not_found(request, exception):
@@ -15,3 +23,27 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@require_GET
+def resized_image(request, sig, width, height, mode, name):
+    """Serve ``name`` resized by ``core.images`` from a signed URL."""
+    if (mode not in images.MODES
+            or not images.check_signature(sig, name, width, height, mode)):
+        raise Http404
+    try:
+        path = images.get_resized(name, width, height, mode)
+    except OSError:
+        raise Http404
+    if settings.IMAGE_RESIZE_ACCEL_REDIRECT:
+        # Let nginx send the file itself.
+        relative = os.path.relpath(path, settings.IMAGE_RESIZE_ROOT)
+        response = HttpResponse(content_type='image/jpeg')
+        response['X-Accel-Redirect'] = (
+            settings.IMAGE_RESIZE_ACCEL_REDIRECT + relative)
+    else:
+        # Handed to wsgi.file_wrapper, i.e. sendfile() under gunicorn.
+        response = FileResponse(open(path, 'rb'), content_type='image/jpeg')
+    patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60,
+                        immutable=True)
+    return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Comment, Follow
 
 
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search the full-text index instead of LIKE scans."""
+        if not search.available() or not search.match_expression(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return search.filter_matching(queryset, search_term), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
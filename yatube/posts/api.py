@@ -0,0 +1,349 @@
+"""Read-only JSON API, version 1.
+
+Lists are paged forward with keyset cursors over ``(pub_date, pk)``
+(``?after=``, ``?limit=``); ``?fields=`` picks the top-level fields of
+each item and only their columns are selected. Rows are read with
+``values()`` joined to their author and group, so every list is one
+query and no model instances or templates are involved.
+
+Public responses are cached for ``CACHE_TIMEOUT`` seconds under the
+cache tags of the matching HTML page, keyed by the normalized query
+parameters; any other parameter is refused. Every response carries an
+``ETag`` of its body and requests whose ``If-None-Match`` matches get
+304.
+"""
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+from functools import wraps
+from itertools import dropwhile, islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET
+
+from core import cache_tags
+from .feeds import recent_posts
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+
+MAX_LIMIT = 100
+
+QUERY_PARAMETERS = {'after', 'fields', 'limit'}
+
+CACHE_TIMEOUT = 10 * 60
+
+POST_FIELDS = {
+    'id': ['id'],
+    'text': ['text'],
+    'pub_date': ['pub_date'],
+    'image': ['image'],
+    'comment_count': ['comment_count'],
+    'author': ['author_id', 'author__username', 'author__first_name',
+               'author__last_name'],
+    'group': ['group_id', 'group__slug', 'group__title'],
+}
+
+COMMENT_FIELDS = {
+    'id': ['id'],
+    'post': ['post_id'],
+    'text': ['text'],
+    'created': ['created'],
+    'author': ['author_id', 'author__username', 'author__first_name',
+               'author__last_name'],
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def api_view(view):
+    """Allow GET only and answer errors with JSON."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            unknown = set(request.GET) - QUERY_PARAMETERS
+            if unknown:
+                raise BadRequest(
+                    f'Unknown parameters: {", ".join(sorted(unknown))}.')
+            return view(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        except BadRequest as error:
+            return JsonResponse({'detail': str(error)}, status=400)
+    return wrapper
+
+
+def respond(request, build, tags=None):
+    """Serialize ``build()`` to JSON, cached under ``tags`` if given,
+    and answer 304 when the client has the same body."""
+    def render():
+        body = json.dumps(build(), cls=DjangoJSONEncoder,
+                          ensure_ascii=False).encode()
+        return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+    if tags is None:
+        body, etag = render()
+    else:
+        # Bodies hold absolute URIs, so they vary on scheme and host too.
+        body, etag = cache_tags.get_or_set(
+            'api', tags, render, timeout=CACHE_TIMEOUT, vary_on=[
+                request.scheme, request.get_host(), request.path,
+                *cache_parameters(request)])
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def cache_parameters(request):
+    """The query parameters in a canonical form, so spellings of the
+    same request share one cache entry."""
+    after = request.GET.get('after')
+    fields = request.GET.get('fields') or ''
+    return [
+        encode_cursor(*decode_cursor(after)) if after else '',
+        page_limit(request),
+        ','.join(sorted({field.strip() for field in fields.split(',')}
+                        - {''})),
+    ]
+
+
+def requested_fields(request, known):
+    """Fields asked for with ``?fields=``, in the order of ``known``."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(known)
+    fields = {field.strip() for field in fields.split(',')} - {''}
+    unknown = fields - set(known)
+    if unknown:
+        raise BadRequest(f'Unknown fields: {", ".join(sorted(unknown))}.')
+    return [field for field in known if field in fields]
+
+
+def columns(fields, known, prefix=''):
+    names = set()
+    for field in fields:
+        names.update(known[field])
+    return [prefix + name for name in sorted(names)]
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().split('|')
+        value = parse_datetime(value)
+        if value is None:
+            raise ValueError
+        return value, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest('Invalid cursor.')
+
+
+def page_limit(request):
+    try:
+        limit = min(int(request.GET.get('limit', settings.POST_LIM)),
+                    MAX_LIMIT)
+    except ValueError:
+        raise BadRequest('Invalid limit.')
+    if limit < 1:
+        raise BadRequest('Invalid limit.')
+    return limit
+
+
+def keyset_page(request, queryset, key, pk, descending=True):
+    """Return one page of ``values()`` rows ordered by ``(key, pk)``
+    after the request's cursor, and the cursor of the next page."""
+    limit = page_limit(request)
+    sign, lookup = ('-', 'lt') if descending else ('', 'gt')
+    after = request.GET.get('after')
+    if after:
+        value, last = decode_cursor(after)
+        # Bounding the key alone as well lets SQLite seek the index.
+        queryset = queryset.filter(
+            Q(**{f'{key}__{lookup}e': value}),
+            Q(**{f'{key}__{lookup}': value}) | Q(**{f'{pk}__{lookup}': last}))
+    rows = list(queryset.order_by(f'{sign}{key}', f'{sign}{pk}')
+                [:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][key], rows[-1][pk])
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['after'] = cursor
+    return request.build_absolute_uri(
+        f'{request.path}?{urlencode(sorted(query.items()))}')
+
+
+def user_data(row, prefix):
+    return {
+        'id': row[f'{prefix}author_id'],
+        'username': row[f'{prefix}author__username'],
+        'first_name': row[f'{prefix}author__first_name'],
+        'last_name': row[f'{prefix}author__last_name'],
+    }
+
+
+def post_data(request, row, fields, prefix=''):
+    data = {}
+    for field in fields:
+        if field == 'author':
+            data['author'] = user_data(row, prefix)
+        elif field == 'group':
+            data['group'] = None if row[f'{prefix}group_id'] is None else {
+                'id': row[f'{prefix}group_id'],
+                'slug': row[f'{prefix}group__slug'],
+                'title': row[f'{prefix}group__title'],
+            }
+        elif field == 'image':
+            name = row[f'{prefix}image']
+            data['image'] = request.build_absolute_uri(
+                Post._meta.get_field('image').storage.url(name)
+            ) if name else None
+        else:
+            data[field] = row[prefix + POST_FIELDS[field][0]]
+    return data
+
+
+def comment_data(row, fields):
+    data = {}
+    for field in fields:
+        if field == 'author':
+            data['author'] = user_data(row, '')
+        else:
+            data[field] = row[COMMENT_FIELDS[field][0]]
+    return data
+
+
+def post_list(request, queryset, prefix='', key='pub_date', pk='id'):
+    """Return a page of posts from ``queryset`` ordered by ``(key, pk)``;
+    timeline entries pass ``prefix='post__'``."""
+    fields = requested_fields(request, POST_FIELDS)
+    rows, cursor = keyset_page(
+        request,
+        queryset.values(key, pk, *columns(fields, POST_FIELDS, prefix)),
+        key, pk)
+    return {
+        'results': [post_data(request, row, fields, prefix) for row in rows],
+        'next': page_url(request, cursor),
+    }
+
+
+def merged_post_list(request, author_ids):
+    """Return a page of the authors' posts merged from their cached
+    recent post lists, as the pull engine of ``follow_index`` does."""
+    fields = requested_fields(request, POST_FIELDS)
+    limit = page_limit(request)
+    merged = heapq.merge(*recent_posts(author_ids), reverse=True)
+    after = request.GET.get('after')
+    if after:
+        cursor = decode_cursor(after)
+        merged = dropwhile(lambda key: key >= cursor, merged)
+    keys = list(islice(merged, limit + 1))
+    cursor = encode_cursor(*keys[limit - 1]) if len(keys) > limit else None
+    keys = keys[:limit]
+    rows = {row['id']: row for row in Post.objects.filter(
+        pk__in=[pk for _, pk in keys]).order_by().values(
+        'id', *columns(fields, POST_FIELDS))}
+    return {
+        'results': [post_data(request, rows[pk], fields)
+                    for _, pk in keys if pk in rows],
+        'next': page_url(request, cursor),
+    }
+
+
+def get_pk(queryset, **lookup):
+    pk = queryset.filter(**lookup).values_list('pk', flat=True).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+@api_view
+def posts(request):
+    return respond(request, lambda: post_list(request, Post.objects),
+                   ['feed:index', 'groups', 'users'])
+
+
+@api_view
+def post_detail(request, post_id):
+    def build():
+        fields = requested_fields(request, POST_FIELDS)
+        row = Post.objects.filter(pk=post_id).values(
+            *columns(fields, POST_FIELDS)).first()
+        if row is None:
+            raise Http404
+        return post_data(request, row, fields)
+    return respond(request, build, [f'post:{post_id}', 'groups', 'users'])
+
+
+@api_view
+def comments(request, post_id):
+    def build():
+        get_pk(Post.objects, pk=post_id)
+        fields = requested_fields(request, COMMENT_FIELDS)
+        rows, cursor = keyset_page(
+            request,
+            Comment.objects.filter(post_id=post_id).values(
+                'created', 'id', *columns(fields, COMMENT_FIELDS)),
+            'created', 'id', descending=False)
+        return {
+            'results': [comment_data(row, fields) for row in rows],
+            'next': page_url(request, cursor),
+        }
+    return respond(request, build, [f'post:{post_id}', 'users'])
+
+
+@api_view
+def group_posts(request, slug):
+    group_id = get_pk(Group.objects, slug=slug)
+    return respond(
+        request,
+        lambda: post_list(request, Post.objects.filter(group_id=group_id)),
+        [f'group:{group_id}', 'groups', 'users'])
+
+
+@api_view
+def profile_posts(request, username):
+    author_id = get_pk(User.objects, username=username)
+    return respond(
+        request,
+        lambda: post_list(request, Post.objects.filter(author_id=author_id)),
+        [f'author:{author_id}', 'groups', 'users'])
+
+
+@api_view
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=401)
+    if settings.FOLLOW_FEED_ENGINE == 'timeline':
+        # Entries copy pub_date, so the index on (user, pub_date) serves
+        # the page.
+        data = post_list(
+            request, TimelineEntry.objects.filter(user=request.user),
+            prefix='post__')
+    else:
+        data = merged_post_list(request, Follow.objects.filter(
+            user=request.user).values_list('author_id', flat=True))
+    response = respond(request, lambda: data)
+    response['Vary'] = 'Cookie'
+    return response
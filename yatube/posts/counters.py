@@ -0,0 +1,96 @@
+"""Denormalized counters.
+
+Feed totals live in the cache: they are filled lazily by
+``CachedCountPaginator`` and adjusted in place by the model signals, so
+a feed page never needs a COUNT(*) once its counter is warm.
+``Post.comment_count`` and ``UserStats`` live in the database and are
+updated with F() expressions; ``reconcile_counters`` repairs drift.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+# Follow feeds change whenever any followed author posts, so their
+# totals are estimates that are simply left to expire.
+FOLLOW_COUNT_TIMEOUT = 60
+
+
+def post_count_key(scope, pk=None):
+    if pk is None:
+        return f'post_count:{scope}'
+    return f'post_count:{scope}:{pk}'
+
+
+def post_count_keys(group_id):
+    keys = [post_count_key('index')]
+    if group_id is not None:
+        keys.append(post_count_key('group', group_id))
+    return keys
+
+
+def adjust(keys, delta):
+    """Shift warm counters by ``delta``; cold ones are left to refill."""
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+
+def count_of(queryset, field, ref='pk'):
+    """Correlated COUNT of ``queryset`` rows whose ``field`` points at
+    the outer row."""
+    return Coalesce(Subquery(
+        queryset.order_by().filter(**{field: OuterRef(ref)}).values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile_comment_counts():
+    """Fix ``Post.comment_count`` wherever it drifted; return the number
+    of corrected posts."""
+    actual = count_of(Comment.objects.all(), 'post')
+    drifted = Post.objects.annotate(actual=actual).exclude(
+        comment_count=F('actual')).values('pk')
+    return Post.objects.filter(pk__in=drifted).update(comment_count=actual)
+
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute ``UserStats`` from the data, creating missing rows."""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in
+         users.filter(stats__isnull=True).values_list('pk', flat=True)),
+        ignore_conflicts=True
+    )
+    return UserStats.objects.filter(user__in=users).update(
+        posts_count=count_of(Post.objects.all(), 'author', 'user_id'),
+        followers_count=count_of(Follow.objects.all(), 'author', 'user_id'),
+        following_count=count_of(Follow.objects.all(), 'user', 'user_id'),
+    )
+
+
+def bump_stats(user_id, field, delta):
+    """Atomically shift one ``UserStats`` counter of a user.
+
+    A missing row is rebuilt from the data on increments only: decrements
+    also run while a user is being deleted and must not resurrect it.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    if not stats.update(**{field: F(field) + delta}) and delta > 0:
+        rebuild_user_stats([user_id])
+
+
+def user_stats(user):
+    """Return the user's stats, rebuilding the row if it is missing."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild_user_stats([user.pk])
+        return UserStats.objects.get(user=user)
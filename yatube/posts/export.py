@@ -0,0 +1,74 @@
+"""Streaming export of an author's posts with their comments.
+
+Posts are read with ``.iterator()`` and the comments of each chunk of
+posts with one more query, so memory stays flat however many posts the
+author has. Every post becomes one JSON line in the format read by
+``manage.py import_content``, with its comments nested.
+"""
+import json
+import zlib
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment
+
+CHUNK_SIZE = 500
+
+
+def post_record(post, comments):
+    return {
+        'type': 'post',
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'image': post.image.name or None,
+        'comments': [{
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created,
+        } for comment in comments],
+    }
+
+
+def export_lines(author, chunk_size=CHUNK_SIZE):
+    """Yield the posts of ``author``, oldest first, as JSON lines."""
+    posts = author.posts.select_related('author', 'group').order_by(
+        'pub_date', 'pk').iterator(chunk_size=chunk_size)
+    for chunk in iter(lambda: list(islice(posts, chunk_size)), []):
+        comments = {post.pk: [] for post in chunk}
+        for comment in Comment.objects.filter(
+                post_id__in=comments).select_related('author').order_by(
+                'created', 'pk'):
+            comments[comment.post_id].append(comment)
+        for post in chunk:
+            yield json.dumps(post_record(post, comments[post.pk]),
+                             cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def encoded(lines):
+    """Encode ``lines`` to UTF-8, joined into blocks of at least 64 KiB
+    so the response is not sent in tiny writes."""
+    block = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        size += len(data)
+        if size >= 65536:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def gzipped(blocks):
+    """Compress ``blocks`` into a gzip stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,131 @@
+"""Follow feed engines.
+
+``settings.FOLLOW_FEED_ENGINE`` picks how ``follow_index`` is built:
+
+* ``'timeline'`` pages the materialized ``TimelineEntry`` rows filled
+  by fan-out-on-write (see ``posts.timeline``);
+* ``'pull'`` merges cached per-author lists of recent post ids with a
+  k-way heap merge and loads only the merged page, so authors with huge
+  audiences cost nothing on write.
+"""
+import heapq
+from itertools import dropwhile, islice, takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger
+
+from core.paginator import CachedCountPaginator
+from .counters import FOLLOW_COUNT_TIMEOUT, post_count_key
+from .models import Follow, Post, TimelineEntry
+
+
+def recent_posts_key(author_id):
+    return f'recent_posts:{author_id}'
+
+
+def recent_posts(author_ids):
+    """Return ``(pub_date, pk)`` lists, newest first, one per author.
+
+    Lists are bounded by ``settings.TIMELINE_LIM`` and read with one
+    cache multi-get; only cold authors hit the database.
+    """
+    keys = {recent_posts_key(author_id): author_id
+            for author_id in author_ids}
+    streams = cache.get_many(keys)
+    missing = {}
+    for key, author_id in keys.items():
+        if key not in streams:
+            missing[key] = list(
+                Post.objects.filter(author_id=author_id)
+                .order_by('-pub_date', '-pk')
+                .values_list('pub_date', 'pk')[:settings.TIMELINE_LIM]
+            )
+    cache.set_many(missing)
+    streams.update(missing)
+    return list(streams.values())
+
+
+class TimelinePaginator(CachedCountPaginator):
+    """Pages ``TimelineEntry`` rows and hands out their posts."""
+
+    def get_page(self, *args, **kwargs):
+        page = super().get_page(*args, **kwargs)
+        page.object_list = [entry.post for entry in page.object_list]
+        return page
+
+
+class PullFeedPaginator(CachedCountPaginator):
+    """Merges per-author recent post lists into one feed."""
+
+    def __init__(self, author_ids, per_page, **kwargs):
+        super().__init__(Post.objects.select_related('author', 'group'),
+                         per_page, **kwargs)
+        self.streams = recent_posts(author_ids)
+
+    @property
+    def count(self):
+        return sum(len(stream) for stream in self.streams)
+
+    def get_page(self, number=None, after=None, before=None):
+        cursor = self.decode_cursor(after or before)
+        merged = heapq.merge(*self.streams, reverse=True)
+        if cursor is None:
+            try:
+                number = self.validate_number(number or 1)
+            except PageNotAnInteger:
+                number = 1
+            except EmptyPage:
+                number = self.num_pages
+            start = (number - 1) * self.per_page
+            keys = list(islice(merged, start, start + self.per_page + 1))
+            has_previous = number > 1
+            has_next = len(keys) > self.per_page
+            keys = keys[:self.per_page]
+        elif after:
+            number, value, pk = cursor
+            keys = list(islice(
+                dropwhile(lambda key: key >= (value, pk), merged),
+                self.per_page + 1
+            ))
+            number += 1
+            has_previous = True
+            has_next = len(keys) > self.per_page
+            keys = keys[:self.per_page]
+        else:
+            number, value, pk = cursor
+            newer = list(takewhile(lambda key: key > (value, pk), merged))
+            has_previous = len(newer) > self.per_page
+            has_next = True
+            number = number - 1 if has_previous else 1
+            keys = newer[-self.per_page:]
+        posts = self.object_list.in_bulk([pk for _, pk in keys])
+        page = self._get_page([posts[pk] for _, pk in keys if pk in posts],
+                              number, self)
+        self._set_cursors(page, has_previous, has_next)
+        self.page_window = self.get_page_window(page.number)
+        return page
+
+
+def timeline_paginator(user, per_page):
+    entries = TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group')
+    return TimelinePaginator(entries, per_page,
+                             count_key=post_count_key('follow', user.pk),
+                             count_timeout=FOLLOW_COUNT_TIMEOUT)
+
+
+def pull_paginator(user, per_page):
+    author_ids = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True)
+    return PullFeedPaginator(list(author_ids), per_page)
+
+
+ENGINES = {
+    'timeline': timeline_paginator,
+    'pull': pull_paginator,
+}
+
+
+def follow_paginator(user, per_page):
+    return ENGINES[settings.FOLLOW_FEED_ENGINE](user, per_page)
@@ -1,4 +1,5 @@
 from django import forms
+from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
 from .models import Post, Comment, Group
@@ -18,11 +19,49 @@ class GroupForm(forms.ModelForm):
             'description': _('Напишите краткую характеристику, о чем группа'),
         }
 
+
+class GroupAutocompleteSelect(forms.Select):
+    """Select that renders only the chosen group.
+
+    Other options are fetched by ``static/js/group_autocomplete.js``
+    from the autocomplete endpoint while the user types, so the page
+    does not grow with the number of groups.
+    """
+
+    class Media:
+        js = ('js/group_autocomplete.js',)
+
+    def __init__(self, attrs=None):
+        attrs = {'data-autocomplete-url': reverse_lazy(
+            'posts:group_autocomplete'), **(attrs or {})}
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        # Values come from the submitted form and may not be valid keys.
+        chosen = [item for item in value if str(item).isdigit()]
+        choices = []
+        if self.choices.field.empty_label is not None:
+            choices.append(('', self.choices.field.empty_label))
+        if chosen:
+            queryset = self.choices.queryset.filter(pk__in=chosen)
+            choices += [self.choices.choice(obj) for obj in queryset]
+        groups = []
+        for index, (option_value, label) in enumerate(choices):
+            selected = str(option_value) in value
+            groups.append((None, [self.create_option(
+                name, option_value, label, selected, index, attrs=attrs,
+            )], index))
+        return groups
+
+
 class PostForm(forms.ModelForm):
     """Form for creating and updating posts."""
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        widgets = {
+            'group': GroupAutocompleteSelect,
+        }
         labels = {
             'text': _('Текст поста'),
             'image': _('Картинка'),
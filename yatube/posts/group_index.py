@@ -0,0 +1,56 @@
+"""In-process prefix index over group titles and slugs.
+
+Serves the autocomplete of the group picker in ``PostForm``. Every word
+of a title, the whole title and the slug are kept lowercased in one
+sorted list, so a prefix lookup is a binary search plus a short scan.
+The index is rebuilt lazily when the ``groups`` cache tag, bumped on
+every ``Group`` save and delete, changes.
+"""
+import bisect
+import threading
+
+from core import cache_tags
+from .models import Group
+
+
+class PrefixIndex:
+    def __init__(self, version, groups):
+        self.version = version
+        self.titles = {}
+        keys = set()
+        for pk, title, slug in groups:
+            self.titles[pk] = title
+            for key in {*title.lower().split(), title.lower(), slug.lower()}:
+                keys.add((key, pk))
+        self.keys = sorted(keys)
+
+    def search(self, prefix, limit):
+        """Return up to ``limit`` ``(pk, title)`` of groups having a
+        title word, the title or the slug starting with ``prefix``."""
+        prefix = prefix.strip().lower()
+        found = []
+        start = bisect.bisect_left(self.keys, (prefix,))
+        for key, pk in self.keys[start:]:
+            if not key.startswith(prefix) or len(found) == limit:
+                break
+            if pk not in found:
+                found.append(pk)
+        return [(pk, self.titles[pk]) for pk in found]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    version, = cache_tags.get_versions(['groups'])
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = PrefixIndex(version, Group.objects.values_list(
+                'pk', 'title', 'slug'))
+        return _index
+
+
+def search(prefix, limit=10):
+    return get_index().search(prefix, limit)
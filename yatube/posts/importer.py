@@ -0,0 +1,300 @@
+"""Bulk import of users, groups, posts and follows.
+
+Records are streamed from JSONL or CSV files and written with
+``bulk_create`` in batches, one transaction per batch, so memory stays
+bounded by the batch size whatever the size of the input. Every record
+has a ``type`` (``user``, ``group``, ``post`` or ``follow``), taken
+from its ``type`` field or given for the whole file. Authors and
+groups are referenced by username and slug and resolved through
+bounded lookup maps that query the database once per batch for the
+names they have not seen yet.
+
+``bulk_create`` sends no signals, so the importer maintains what they
+would have: posts are added to the search index batch by batch, and
+``finish`` rebuilds ``UserStats``, the follow timelines of affected
+readers and the cached counters and tags of the affected pages.
+"""
+import csv
+import gzip
+import io
+import json
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pytils.translit import slugify
+
+from core import cache_tags
+from . import counters, search, timeline
+from .feeds import recent_posts_key
+from .models import Follow, Group, Post, TimelineEntry, User
+
+TYPES = ('user', 'group', 'post', 'follow')
+
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path), encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(path, record_type=None):
+    """Yield the records of a ``.jsonl`` or ``.csv`` file, optionally
+    gzipped, one at a time."""
+    name = path[:-3] if path.endswith('.gz') else path
+    with open_text(path) as source:
+        if name.endswith('.csv'):
+            rows = csv.DictReader(source)
+        else:
+            rows = (json.loads(line) for line in source if line.strip())
+        for row in rows:
+            if record_type is not None:
+                row.setdefault('type', record_type)
+            yield row
+
+
+class LookupMap:
+    """Bounded map of natural keys to primary keys.
+
+    ``resolve`` fetches every key of a batch missing from the map with
+    one query; the least recently used keys are dropped beyond
+    ``maxsize``.
+    """
+
+    def __init__(self, queryset, field, maxsize=100000):
+        self.queryset = queryset
+        self.field = field
+        self.maxsize = maxsize
+        self.pks = OrderedDict()
+
+    def resolve(self, keys):
+        keys = set(keys) - {None, ''}
+        missing = [key for key in keys if key not in self.pks]
+        if missing:
+            self.pks.update(self.queryset.filter(**{
+                f'{self.field}__in': missing}).values_list(self.field, 'pk'))
+        found = {}
+        for key in keys:
+            if key in self.pks:
+                self.pks.move_to_end(key)
+                found[key] = self.pks[key]
+        while len(self.pks) > self.maxsize:
+            self.pks.popitem(last=False)
+        return found
+
+
+def parse_date(value):
+    """Parse an ISO 8601 datetime; naive ones are in ``TIME_ZONE``."""
+    if not value:
+        return None
+    value = parse_datetime(value)
+    if value is None:
+        raise ValueError('Invalid pub_date')
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+@contextmanager
+def keeping_pub_date():
+    """Let ``bulk_create`` store given publication dates instead of
+    overwriting them with ``auto_now_add``."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Importer:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = LookupMap(User.objects.all(), 'username')
+        self.groups = LookupMap(Group.objects.all(), 'slug')
+        self.counts = Counter()
+        self.skipped = Counter()
+        self.first_post_pk = self.last_post_pk = self._max_pk(Post)
+        self.first_follow_pk = self._max_pk(Follow)
+        self.group_ids = set()
+
+    @staticmethod
+    def _max_pk(model):
+        return model.objects.aggregate(pk=Max('pk'))['pk'] or 0
+
+    def run(self, records):
+        """Import ``records``; consecutive records of the same type are
+        written together in batches."""
+        for record_type, group in groupby(records, lambda r: r.get('type')):
+            if record_type not in TYPES:
+                raise ValueError(f'Unknown record type {record_type!r}')
+            build = getattr(self, f'import_{record_type}s')
+            while True:
+                batch = list(islice(group, self.batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    build(batch)
+                yield record_type, len(batch)
+
+    def insert_new(self, record_type, model, objects, fields):
+        """Insert the ``objects`` whose ``fields`` match no stored row
+        nor an earlier object, and count them as imported and the rest
+        as skipped.
+
+        ``bulk_create`` does not tell which rows ``ignore_conflicts``
+        dropped, so stored rows are looked up first; the flag then only
+        covers rows written concurrently since.
+        """
+        unique = {}
+        for obj in objects:
+            unique.setdefault(
+                tuple(getattr(obj, field) for field in fields), obj)
+        stored = set(model.objects.filter(**{
+            f'{field}__in': {key[i] for key in unique}
+            for i, field in enumerate(fields)
+        }).values_list(*fields)) if unique else set()
+        new = [obj for key, obj in unique.items() if key not in stored]
+        model.objects.bulk_create(new, ignore_conflicts=True)
+        self.counts[record_type] += len(new)
+        self.skipped[record_type] += len(objects) - len(new)
+
+    def import_users(self, rows):
+        users = [User(
+            username=row['username'],
+            email=row.get('email') or '',
+            first_name=row.get('first_name') or '',
+            last_name=row.get('last_name') or '',
+            # Only password hashes are accepted, as in Django dumps.
+            password=row.get('password') or make_password(None),
+        ) for row in rows]
+        self.insert_new('user', User, users, ['username'])
+
+    def import_groups(self, rows):
+        groups = [Group(
+            title=row['title'],
+            slug=row.get('slug') or slugify(row['title'])[:100],
+            description=row.get('description') or '',
+        ) for row in rows]
+        self.insert_new('group', Group, groups, ['slug'])
+
+    def import_posts(self, rows):
+        authors = self.users.resolve(row.get('author') for row in rows)
+        groups = self.groups.resolve(row.get('group') for row in rows)
+        now = timezone.now()
+        posts = []
+        for row in rows:
+            if row.get('author') not in authors or (
+                    row.get('group') and row['group'] not in groups):
+                self.skipped['post'] += 1
+                continue
+            posts.append(Post(
+                author_id=authors[row['author']],
+                group_id=groups.get(row.get('group')),
+                text=row['text'],
+                pub_date=parse_date(row.get('pub_date')) or now,
+            ))
+        with keeping_pub_date():
+            Post.objects.bulk_create(posts)
+        self.group_ids.update(post.group_id for post in posts)
+        # SQLite does not return primary keys from bulk inserts, so new
+        # posts are indexed as the range above the last known one.
+        last_pk = self._max_pk(Post)
+        search.index_range(self.last_post_pk, last_pk)
+        self.last_post_pk = last_pk
+        self.counts['post'] += len(posts)
+
+    def import_follows(self, rows):
+        users = self.users.resolve(
+            name for row in rows for name in (row.get('user'),
+                                              row.get('author')))
+        follows = []
+        for row in rows:
+            user, author = users.get(row.get('user')), users.get(
+                row.get('author'))
+            if user is None or author is None or user == author:
+                self.skipped['follow'] += 1
+                continue
+            follows.append(Follow(user_id=user, author_id=author))
+        self.insert_new('follow', Follow, follows, ['user_id', 'author_id'])
+
+    def pages(self, queryset, field):
+        """Yield the distinct values of ``field`` in ``queryset`` a batch
+        at a time, paging by value so no cursor stays open across the
+        writes done between pages."""
+        queryset = queryset.order_by(field).values_list(
+            field, flat=True).distinct()
+        page = list(queryset[:self.batch_size])
+        while page:
+            yield page
+            page = list(queryset.filter(**{f'{field}__gt': page[-1]})
+                        [:self.batch_size])
+
+    def fan_out(self):
+        """Add imported posts and follows to the follow timelines."""
+        new_follows = Follow.objects.filter(pk__gt=self.first_follow_pk)
+        for page in self.pages(new_follows, 'author_id'):
+            with transaction.atomic():
+                for author_id in page:
+                    timeline.backfill_since(author_id, self.first_follow_pk)
+        with transaction.atomic():
+            timeline.fan_out_since(self.first_post_pk)
+        crowded = TimelineEntry.objects.values('user_id').annotate(
+            entries=Count('pk')).filter(entries__gt=settings.TIMELINE_LIM)
+        for page in self.pages(crowded, 'user_id'):
+            with transaction.atomic():
+                for user_id in page:
+                    timeline.trim(user_id)
+
+    def finish(self):
+        """Bring derived data in step with the imported rows."""
+        new_posts = Post.objects.filter(pk__gt=self.first_post_pk)
+        counters.rebuild_user_stats()
+        if settings.FOLLOW_FEED_ENGINE == 'timeline':
+            self.fan_out()
+        # Dropped tags restart from fresh versions, which invalidates
+        # them like a bump but takes one cache call per page.
+        readers = Follow.objects.filter(
+            Q(author__in=new_posts.values('author_id'))
+            | Q(pk__gt=self.first_follow_pk))
+        for page in self.pages(readers, 'user_id'):
+            cache_tags.drop(*(f'follow:{pk}' for pk in page))
+            cache.delete_many([counters.post_count_key('follow', pk)
+                               for pk in page])
+        for page in self.pages(new_posts, 'author_id'):
+            cache_tags.drop(*(f'author:{pk}' for pk in page))
+            cache.delete_many([recent_posts_key(pk) for pk in page])
+        group_ids = self.group_ids - {None}
+        cache.delete_many([counters.post_count_key('index')] + [
+            counters.post_count_key('group', pk) for pk in group_ids])
+        cache_tags.bump('feed:index', 'groups', 'users', 'usernames',
+                        *(f'group:{pk}' for pk in group_ids))
+
+
+def import_files(paths, record_type=None, batch_size=1000, progress=None):
+    """Import ``paths`` in order and return the importer.
+
+    ``progress`` is called as ``progress(importer, rows, elapsed)``
+    after every batch. Derived data is brought up to date even when a
+    batch fails, since the batches before it stay committed.
+    """
+    importer = Importer(batch_size)
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for path in paths:
+            for _, count in importer.run(read_records(path, record_type)):
+                rows += count
+                if progress is not None:
+                    progress(importer, rows, time.perf_counter() - started)
+    finally:
+        importer.finish()
+    return importer
@@ -0,0 +1,96 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts import timeline
+from posts.feeds import ENGINES
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+# Runs read and clear a private cache; the site cache is never touched.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-follow-feed',
+    },
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Compare follow feed engines with the Follow/Post join on '
+            'synthetic data. Nothing is left in the database or cache.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=50,
+                            help='Posts per author.')
+        parser.add_argument('--pages', type=int, default=5,
+                            help='Feed pages read per run.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES,
+                                   FOLLOW_FEED_ENGINE='timeline'), \
+                    transaction.atomic():
+                reader = self.populate(options['authors'], options['posts'])
+                for name, read_page in self.readers(reader).items():
+                    elapsed = self.measure(read_page, options)
+                    self.stdout.write(
+                        f'{name:>8}: {elapsed * 1000:.2f} ms per page')
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, authors, posts):
+        self.stdout.write(f'Creating {authors} authors with '
+                          f'{posts} posts each...')
+        reader = User.objects.create_user(username='benchmark-reader')
+        User.objects.bulk_create(
+            User(username=f'benchmark-author-{i}') for i in range(authors))
+        users = User.objects.filter(username__startswith='benchmark-author-')
+        Post.objects.bulk_create(
+            (Post(text=f'Post {i}', author=author)
+             for author in users for i in range(posts)),
+            batch_size=500
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in users)
+        timeline.rebuild(reader.pk)
+        return reader
+
+    def readers(self, reader):
+        def join(number):
+            posts = Post.objects.select_related('author', 'group').filter(
+                author__following__user=reader)
+            return list(Paginator(posts, settings.POST_LIM).page(number))
+
+        def engine(name):
+            def read_page(number):
+                paginator = ENGINES[name](reader, settings.POST_LIM)
+                return list(paginator.get_page(number))
+            return read_page
+
+        return {'join': join,
+                'timeline': engine('timeline'),
+                'pull': engine('pull')}
+
+    def measure(self, read_page, options):
+        cache.clear()
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            for number in range(1, options['pages'] + 1):
+                read_page(number)
+        return ((time.perf_counter() - started)
+                / (options['repeat'] * options['pages']))
@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Stream an author's posts with their comments as JSON lines, "
+            'in the format read by import_content.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', default='-',
+                            help='File to write (default: stdout).')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress the output with gzip.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=export.CHUNK_SIZE,
+                            help='Posts read per query.')
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user {options["username"]!r}')
+        blocks = export.encoded(
+            export.export_lines(author, options['chunk_size']))
+        if options['gzip']:
+            blocks = export.gzipped(blocks)
+        if options['output'] == '-':
+            target = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+            for block in blocks:
+                target.write(block)
+            target.flush()
+            return
+        with open(options['output'], 'wb') as target:
+            for block in blocks:
+                target.write(block)
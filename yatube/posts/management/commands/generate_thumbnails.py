@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import cache_tags
+from posts import thumbnails
+from posts.models import Post
+from posts.signals import post_tags
+
+
+class Command(BaseCommand):
+    help = ('Generate the thumbnails the templates use for every post '
+            'image, in a pool of processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Worker processes (default: CPU count).')
+        parser.add_argument('--chunksize', type=int, default=16,
+                            help='Images handed to a worker at a time.')
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.exclude(image='').only(
+            'pk', 'image', 'author_id', 'group_id'))
+        names = sorted({post.image.name for post in posts})
+        # Forked workers must not share the parent's connections.
+        connections.close_all()
+        with ProcessPoolExecutor(options['processes']) as pool:
+            for _ in pool.map(thumbnails.generate, names,
+                              chunksize=options['chunksize']):
+                pass
+        cache_tags.bump(*{tag for post in posts for tag in post_tags(post)})
+        self.stdout.write(
+            f'Generated thumbnails of {len(names)} images '
+            f'for {len(posts)} posts.')
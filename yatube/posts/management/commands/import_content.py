@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = ('Stream users, groups, posts and follows from JSONL or CSV '
+            'files (optionally .gz) into the database in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help='Files to import, in order.')
+        parser.add_argument('--type', choices=importer.TYPES,
+                            help='Type of records lacking a "type" field.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows written per bulk insert and '
+                                 'transaction.')
+
+    def progress(self, run, rows, elapsed):
+        self.stdout.write(f'\r{rows} rows, {rows / elapsed:.0f} rows/s',
+                          ending='')
+        self.stdout.flush()
+
+    def handle(self, *args, **options):
+        try:
+            run = importer.import_files(
+                options['paths'], options['type'], options['batch_size'],
+                progress=self.progress)
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Import failed: {error!r}')
+        self.stdout.write('')
+        for record_type in importer.TYPES:
+            if run.counts[record_type] or run.skipped[record_type]:
+                self.stdout.write(
+                    f'{record_type}: {run.counts[record_type]} imported, '
+                    f'{run.skipped[record_type]} skipped')
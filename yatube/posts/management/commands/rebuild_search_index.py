@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts.'
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        self.stdout.write(f'Indexed {indexed} posts.')
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized follow feeds from the Follow table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*',
+                            help='Only rebuild feeds of these users.')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rebuilt = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(f'Rebuilt {rebuilt} feeds.')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ('Recompute denormalized counters (Post.comment_count and '
+            'UserStats) that drifted from the data.')
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile_comment_counts()
+        self.stdout.write(f'Fixed comment_count on {fixed} posts.')
+        rebuilt = counters.rebuild_user_stats()
+        self.stdout.write(f'Rebuilt stats of {rebuilt} users.')
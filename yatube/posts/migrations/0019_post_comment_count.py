@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.filter(post=OuterRef('pk')).values(
+        'post').annotate(total=Count('pk')).values('total')
+    Post.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_auto_20261017_1057'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comments'),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.order_by().filter(**{field: OuterRef('user_id')}).values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats.objects.bulk_create(
+        UserStats(user_id=pk)
+        for pk in User.objects.values_list('pk', flat=True)
+    )
+    UserStats.objects.update(
+        posts_count=count_of(Post.objects.all(), 'author'),
+        followers_count=count_of(Follow.objects.all(), 'author'),
+        following_count=count_of(Follow.objects.all(), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Posts')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Followers')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Following')),
+            ],
+            options={
+                'verbose_name': 'User stats',
+                'verbose_name_plural': 'User stats',
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
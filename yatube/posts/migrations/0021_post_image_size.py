@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:14
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_size(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.exclude(image='').iterator():
+        try:
+            with default_storage.open(post.image.name) as file:
+                post.image_width, post.image_height = Image.open(file).size
+        except (OSError, ValueError):
+            continue
+        post.save(update_fields=('image_width', 'image_height'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Image height'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Image width'),
+        ),
+        migrations.RunPython(fill_image_size, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:17
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+from core.images import placeholder
+
+
+def fill_image_placeholder(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.exclude(image='').iterator():
+        try:
+            with default_storage.open(post.image.name) as file:
+                post.image_placeholder = placeholder(Image.open(file))
+        except (OSError, ValueError):
+            continue
+        post.save(update_fields=('image_placeholder',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Image placeholder'),
+        ),
+        migrations.RunPython(fill_image_placeholder,
+                             migrations.RunPython.noop),
+    ]
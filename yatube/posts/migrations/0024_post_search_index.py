@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "text, group_title, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_post_fts (rowid, text, group_title) "
+        "SELECT p.id, p.text, COALESCE(g.title, '') "
+        "FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 from pytils.translit import slugify
 
+from core import images
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -49,17 +52,73 @@ class Post(models.Model):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(null=True,
+                                              editable=False,
+                                              verbose_name='Image width')
+    image_height = models.PositiveIntegerField(null=True,
+                                               editable=False,
+                                               verbose_name='Image height')
+    image_placeholder = models.TextField(blank=True,
+                                         editable=False,
+                                         verbose_name='Image placeholder')
+    comment_count = models.PositiveIntegerField(default=0,
+                                                editable=False,
+                                                verbose_name='Comments')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        # Ascending, so the descending (pub_date, pk) pages walk the
+        # index backwards and the pk tiebreaker needs no sort.
+        indexes = [
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    # Kept by F() updates in posts.signals; saves of a loaded post must
+    # not write back the value read with it.
+    COUNTER_FIELDS = ('comment_count',)
+
+    def save(self, *args, **kwargs):
+        """Normalize a newly uploaded image before it is stored and leave
+        the counters out of updates."""
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        if self.image and not self.image._committed:
+            normalized = images.normalize(self.image.file)
+            if normalized.content is not None:
+                self.image = normalized.content
+            self.image_width = normalized.width
+            self.image_height = normalized.height
+            self.image_placeholder = normalized.placeholder
+        elif not self.image:
+            self.image_width = self.image_height = None
+            self.image_placeholder = ''
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the comments with one statement rather than a signal
+        per comment; all their signals adjust is this post."""
+        using = using or router.db_for_write(Post, instance=self)
+        with transaction.atomic(using=using):
+            Comment.objects.filter(post=self)._raw_delete(using)
+            return super().delete(using, keep_parents)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post,
@@ -76,6 +135,12 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True,
                                    verbose_name='Publication date')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User,
@@ -96,6 +161,63 @@ class Follow(models.Model):
             models.CheckConstraint(check=~models.Q(user=models.F('author')),
                                    name='check_following')
         ]
+        # Covers the author ids of a reader's follows; the unique
+        # constraint serves the other direction.
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
 
     def __str__(self):
         return f'User {self.user} has followed on {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Materialized row of a user's follow feed"""
+    user = models.ForeignKey(User,
+                             related_name='timeline',
+                             verbose_name='Reader',
+                             on_delete=models.CASCADE)
+    post = models.ForeignKey(Post,
+                             related_name='timeline_entries',
+                             verbose_name='Post',
+                             on_delete=models.CASCADE)
+    pub_date = models.DateTimeField(verbose_name='Publication date')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date'],
+                         name='timeline_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'Post {self.post_id} in feed of {self.user_id}'
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters shown on profile and post pages"""
+    user = models.OneToOneField(User,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='User',
+                                on_delete=models.CASCADE)
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Posts')
+    followers_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Followers')
+    following_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Following')
+
+    class Meta:
+        verbose_name = 'User stats'
+        verbose_name_plural = 'User stats'
+
+    def __str__(self):
+        return f'Stats of {self.user_id}'
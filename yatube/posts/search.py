@@ -0,0 +1,155 @@
+"""Full-text search over posts.
+
+Posts are indexed in the SQLite FTS5 table ``posts_post_fts`` (see
+migration 0024) under their primary key, together with the title of
+their group. Signals keep the index in step with ``Post`` and ``Group``
+inside the same transaction; ``manage.py rebuild_search_index`` fills
+it from scratch. Results are ranked by BM25 and paged with a cursor
+over ``(score, pk)``.
+"""
+import base64
+import binascii
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.utils.html import escape
+
+TABLE = 'posts_post_fts'
+
+# BM25 weights of the indexed columns: text, group_title.
+WEIGHTS = (10.0, 2.0)
+
+# Private-use characters mark matches in snippets until the text is
+# escaped.
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+Result = namedtuple('Result', 'pk score snippet')
+SearchPage = namedtuple('SearchPage', 'results next_cursor')
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description else None
+
+
+def index_post(post):
+    """Add ``post`` to the index or refresh its entry."""
+    if not available():
+        return
+    unindex_post(post.pk)
+    group_title = post.group.title if post.group_id else ''
+    _execute(f'INSERT INTO {TABLE} (rowid, text, group_title) '
+             f'VALUES (%s, %s, %s)', [post.pk, str(post.text), group_title])
+
+
+def unindex_post(pk):
+    if available():
+        _execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pk])
+
+
+def reindex_group(group_id, title):
+    """Store ``title`` as the group title of every post of the group."""
+    if available():
+        _execute(f'UPDATE {TABLE} SET group_title = %s WHERE rowid IN '
+                 f'(SELECT id FROM posts_post WHERE group_id = %s)',
+                 [title, group_id])
+
+
+_SOURCE = ("SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+           "LEFT JOIN posts_group g ON g.id = p.group_id")
+
+
+def rebuild():
+    """Index every post from scratch and return their number."""
+    if not available():
+        return 0
+    _execute(f'DELETE FROM {TABLE}')
+    _execute(f'INSERT INTO {TABLE} (rowid, text, group_title) {_SOURCE}')
+    return _execute(f'SELECT COUNT(*) FROM {TABLE}')[0][0]
+
+
+def index_range(after_pk, last_pk):
+    """(Re)index posts with ``after_pk < pk <= last_pk`` in one pass."""
+    if not available():
+        return
+    _execute(f'DELETE FROM {TABLE} WHERE rowid > %s AND rowid <= %s',
+             [after_pk, last_pk])
+    _execute(f'INSERT INTO {TABLE} (rowid, text, group_title) {_SOURCE} '
+             f'WHERE p.id > %s AND p.id <= %s', [after_pk, last_pk])
+
+
+def match_expression(query):
+    """Turn user input into an FTS5 query: every word must match and
+    the last one may be a prefix."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_matching(queryset, query):
+    """Narrow a ``Post`` queryset to posts matching ``query``."""
+    # RawSQL in pk__in would be wrapped into a scalar subquery.
+    return queryset.extra(
+        where=[f'posts_post.id IN '
+               f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'],
+        params=[match_expression(query) or '""'],
+    )
+
+
+def encode_cursor(result):
+    raw = f'{result.score!r}|{result.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        score, pk = raw.decode().split('|')
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _highlight(snippet):
+    return (escape(snippet).replace(MARK_START, '<mark>')
+            .replace(MARK_END, '</mark>'))
+
+
+def search(query, per_page, after=None):
+    """Return the page of posts best matching ``query`` after the cursor
+    ``after``, best first, with highlighted HTML snippets."""
+    match = match_expression(query)
+    if match is None or not available():
+        return SearchPage([], None)
+    weights = ', '.join(map(str, WEIGHTS))
+    sql = (
+        f'SELECT pk, score, snippet FROM ('
+        f'SELECT rowid AS pk, bm25({TABLE}, {weights}) AS score, '
+        f'snippet({TABLE}, 0, %s, %s, %s, 16) AS snippet '
+        f'FROM {TABLE} WHERE {TABLE} MATCH %s)'
+    )
+    params = [MARK_START, MARK_END, '…', match]
+    cursor = decode_cursor(after)
+    if cursor is not None:
+        sql += ' WHERE score > %s OR (score = %s AND pk > %s)'
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql += ' ORDER BY score, pk LIMIT %s'
+    params.append(per_page + 1)
+    rows = [Result(pk, score, _highlight(snippet))
+            for pk, score, snippet in _execute(sql, params)]
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1])
+    return SearchPage(rows, next_cursor)
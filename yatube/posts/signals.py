@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core import cache_tags
+
+from . import counters, search, tasks, thumbnails, timeline
+from .feeds import recent_posts_key
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def post_tags(post, group_id=None):
+    """Cache tags of every listing that shows ``post``."""
+    tags = ['feed:index', f'author:{post.author_id}', f'post:{post.pk}']
+    for pk in {post.group_id, group_id} - {None}:
+        tags.append(f'group:{pk}')
+    return tags
+
+
+@receiver(pre_save, sender=Post)
+def remember_stored(sender, instance, **kwargs):
+    """Keep the stored group and image, so a moved post updates both
+    groups and a replaced image can be released."""
+    instance._stored_group_id = instance._stored_image = None
+    if instance.pk is not None:
+        instance._stored_group_id, instance._stored_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    search.index_post(instance)
+    tags = post_tags(instance, getattr(instance, '_stored_group_id', None))
+    if created:
+        counters.adjust(counters.post_count_keys(instance.group_id), 1)
+        counters.bump_stats(instance.author_id, 'posts_count', 1)
+        if settings.FOLLOW_FEED_ENGINE == 'timeline':
+            timeline.fan_out(instance)
+        cache_tags.invalidate(
+            *tags, keys=[recent_posts_key(instance.author_id)])
+        return
+    old_image = getattr(instance, '_stored_image', None)
+    if old_image and old_image != instance.image.name:
+        thumbnails.release.enqueue(old_image)
+    old_group_id = getattr(instance, '_stored_group_id', None)
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counters.adjust(
+                [counters.post_count_key('group', old_group_id)], -1)
+        if instance.group_id is not None:
+            counters.adjust(
+                [counters.post_count_key('group', instance.group_id)], 1)
+    cache_tags.invalidate(*tags)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    tasks.unindex_post.enqueue(instance.pk)
+    counters.adjust(counters.post_count_keys(instance.group_id), -1)
+    counters.bump_stats(instance.author_id, 'posts_count', -1)
+    cache_tags.invalidate(*post_tags(instance),
+                          keys=[recent_posts_key(instance.author_id)])
+    if instance.image:
+        thumbnails.release.enqueue(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    cache_tags.invalidate(
+        f'follow:{instance.user_id}',
+        keys=[counters.post_count_key('follow', instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    counters.bump_stats(instance.author_id, 'followers_count', 1)
+    counters.bump_stats(instance.user_id, 'following_count', 1)
+    if settings.FOLLOW_FEED_ENGINE == 'timeline':
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, 'followers_count', -1)
+    counters.bump_stats(instance.user_id, 'following_count', -1)
+    if settings.FOLLOW_FEED_ENGINE == 'timeline':
+        timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+    cache_tags.invalidate(*post_tags(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        cache_tags.invalidate(*post_tags(post))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        cache_tags.invalidate('users')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache_tags.invalidate('groups', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    search.reindex_group(instance.pk, instance.title)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Posts lose their group before post_delete fires.
+    search.reindex_group(instance.pk, '')
@@ -0,0 +1,154 @@
+"""RSS and Atom feeds of the index, groups and profiles.
+
+Feeds list the same posts as the HTML pages. Both the rendered XML and
+the publication date of the newest post are cached under the cache
+tags of the page, which the post signals bump on every change, so a
+poll costs cache lookups only: ``feed_view`` answers conditional
+requests with 304 before anything is rendered.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.db.models import Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from core import cache_tags
+from .models import Group, Post, User
+
+FORMATS = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+
+CACHE_TIMEOUT = 60 * 60
+
+
+class PostsFeed(Feed):
+    """Newest posts of a listing, in the format given on creation."""
+
+    def __init__(self, feed_type):
+        self.feed_type = feed_type
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group').order_by('-pub_date')[:settings.POST_LIM]
+
+    def item_title(self, post):
+        return Truncator(post.text).words(8)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group_id else []
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class ProfileFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+def scope(kind, **kwargs):
+    """Return the feed class, the cache tags and the posts of a feed."""
+    if kind == 'group':
+        group = get_object_or_404(Group.objects.only('pk'),
+                                  slug=kwargs['slug'])
+        return (GroupFeed, [f'group:{group.pk}', 'groups', 'users'],
+                group.posts)
+    if kind == 'profile':
+        author = get_object_or_404(User.objects.only('pk'),
+                                   username=kwargs['username'])
+        return (ProfileFeed, [f'author:{author.pk}', 'groups', 'users'],
+                author.posts)
+    return IndexFeed, ['feed:index', 'groups', 'users'], Post.objects
+
+
+def _state(request, kind, fmt, **kwargs):
+    """Return the feed class, the cache tags and the newest pub_date of
+    a feed; the date is cached under the tags."""
+    request_state = getattr(request, '_feed_state', None)
+    if request_state is None:
+        feed_class, tags, posts = scope(kind, **kwargs)
+        newest = cache_tags.get_or_set(
+            'feed-newest', tags,
+            lambda: posts.aggregate(newest=Max('pub_date'))['newest'] or 0,
+            timeout=CACHE_TIMEOUT, vary_on=[kind, *kwargs.values()])
+        request_state = request._feed_state = (feed_class, tags, newest)
+    return request_state
+
+
+def _last_modified(request, kind, fmt, **kwargs):
+    return _state(request, kind, fmt, **kwargs)[2] or None
+
+
+def _etag(request, kind, fmt, **kwargs):
+    _, tags, newest = _state(request, kind, fmt, **kwargs)
+    versions = ':'.join(map(str, cache_tags.get_versions(sorted(tags))))
+    value = f'{kind}:{fmt}:{newest}:{versions}:{request.get_host()}'
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+@condition(etag_func=_etag, last_modified_func=_last_modified)
+def feed_view(request, kind, fmt, **kwargs):
+    """Serve a feed from the cache, rendering it on a miss."""
+    feed_class, tags, _ = _state(request, kind, fmt, **kwargs)
+    feed_type = FORMATS[fmt]
+    content = cache_tags.get_or_set(
+        'feed', tags,
+        lambda: feed_class(feed_type)(request, **kwargs).content,
+        timeout=CACHE_TIMEOUT,
+        vary_on=[kind, fmt, request.scheme, request.get_host(),
+                 *kwargs.values()])
+    return HttpResponse(content, content_type=feed_type.content_type)
@@ -0,0 +1,9 @@
+from core.tasks import task
+from . import search
+
+
+@task
+def unindex_post(post_id):
+    """Drop a deleted post from the search index; search results skip
+    posts that are gone until then."""
+    search.unindex_post(post_id)
@@ -0,0 +1,19 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, spec):
+    """Usage: ``{% post_thumbnail post 'card' as im %}``."""
+    return thumbnails.lookup(post, spec)
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Resolve thumbnails of every post in ``posts`` with one cache
+    multi-get: ``{% prefetch_thumbnails page_obj %}``."""
+    thumbnails.prefetch(posts)
+    return ''
@@ -0,0 +1,206 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from core import cache_tags
+from posts import api
+from posts.models import Comment, Follow, Group, Post
+from posts.signals import post_tags
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Лев')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Котики', slug='cats')
+        cls.posts = [Post.objects.create(
+            author=cls.author, group=cls.group if i % 2 else None,
+            text=f'Запись {i}') for i in range(5)]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_list_embeds_author_and_group(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:api_posts'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results],
+                         [post.pk for post in reversed(self.posts)])
+        first = results[0]
+        self.assertEqual(first['text'], 'Запись 4')
+        self.assertEqual(first['author']['username'], 'author')
+        self.assertEqual(first['author']['first_name'], 'Лев')
+        self.assertIsNone(first['group'])
+        self.assertEqual(results[1]['group']['slug'], 'cats')
+        self.assertIsNone(first['image'])
+
+    def test_cursor_pagination(self):
+        url = reverse('posts:api_posts')
+        seen = []
+        data = self.client.get(url, {'limit': 2}).json()
+        while True:
+            seen += [item['id'] for item in data['results']]
+            if data['next'] is None:
+                break
+            self.assertIn('limit=2', data['next'])
+            data = self.client.get(data['next']).json()
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_invalid_parameters(self):
+        url = reverse('posts:api_posts')
+        for params in ({'after': 'nonsense'}, {'limit': 'x'},
+                       {'limit': 0}, {'fields': 'id,password'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_unknown_parameters_are_refused(self):
+        response = self.client.get(reverse('posts:api_posts'), {'x': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('x', response.json()['detail'])
+
+    def test_spellings_of_a_query_share_a_cached_body(self):
+        url = reverse('posts:api_posts')
+        first = self.client.get(f'{url}?fields=id,author&limit=2')
+        with self.assertNumQueries(0):
+            second = self.client.get(f'{url}?limit=02&fields=author,,id')
+        self.assertEqual(second.json(), first.json())
+
+    def test_cached_bodies_expire(self):
+        with mock.patch.object(cache_tags, 'get_or_set',
+                               wraps=cache_tags.get_or_set) as get_or_set:
+            self.client.get(reverse('posts:api_posts'))
+        self.assertEqual(get_or_set.call_args[1]['timeout'],
+                         api.CACHE_TIMEOUT)
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse('posts:api_posts'),
+                                   {'fields': 'id,author'})
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'author'})
+
+    def test_post_detail_and_comments(self):
+        response = self.client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk]))
+        self.assertEqual(response.json()['comment_count'], 3)
+        response = self.client.get(
+            reverse('posts:api_comments', args=[self.post.pk]),
+            {'limit': 2})
+        data = response.json()
+        self.assertEqual([item['text'] for item in data['results']],
+                         ['Комментарий 0', 'Комментарий 1'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([item['text'] for item in data['results']],
+                         ['Комментарий 2'])
+        self.assertIsNone(data['next'])
+
+    def test_missing_objects(self):
+        urls = [
+            reverse('posts:api_post_detail', args=[0]),
+            reverse('posts:api_comments', args=[0]),
+            reverse('posts:api_group_posts', args=['dogs']),
+            reverse('posts:api_profile_posts', args=['nobody']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_group_and_profile_posts(self):
+        response = self.client.get(
+            reverse('posts:api_group_posts', args=['cats']))
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(
+            reverse('posts:api_profile_posts', args=['author']))
+        self.assertEqual(len(response.json()['results']), 5)
+        response = self.client.get(
+            reverse('posts:api_profile_posts', args=['reader']))
+        self.assertEqual(response.json()['results'], [])
+
+    def test_read_only(self):
+        response = self.client.post(reverse('posts:api_posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_etag_and_invalidation(self):
+        url = reverse('posts:api_posts')
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        Post.objects.create(author=self.author, text='Новая')
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['results'][0]['text'], 'Новая')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'example.com'])
+    def test_cached_links_follow_scheme_and_host(self):
+        url = reverse('posts:api_posts')
+        self.client.get(url, {'limit': 2})
+        for secure, host, prefix in (
+                (False, 'example.com', 'http://example.com/'),
+                (True, 'testserver', 'https://testserver/')):
+            with self.subTest(host=host, secure=secure):
+                data = self.client.get(url, {'limit': 2}, secure=secure,
+                                       HTTP_HOST=host).json()
+                self.assertTrue(data['next'].startswith(prefix))
+
+    def test_follow_feed(self):
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        for engine in ('timeline', 'pull'):
+            with self.subTest(engine=engine), \
+                    override_settings(FOLLOW_FEED_ENGINE=engine):
+                seen = []
+                data = self.client.get(url, {'limit': 3}).json()
+                seen += [item['id'] for item in data['results']]
+                data = self.client.get(data['next']).json()
+                seen += [item['id'] for item in data['results']]
+                self.assertIsNone(data['next'])
+                self.assertEqual(seen,
+                                 [post.pk for post in reversed(self.posts)])
+                response = self.client.get(url)
+                self.assertEqual(
+                    self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    ).status_code, 304)
+
+
+class InvalidationOnCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Запись')
+
+    def test_entries_cached_before_commit_are_dropped(self):
+        tags = post_tags(self.post)
+        with transaction.atomic():
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text='Комментарий')
+            # Another request caches what it read before the commit.
+            cache_tags.get_or_set('api', tags, lambda: 'stale')
+        self.assertEqual(
+            cache_tags.get_or_set('api', tags, lambda: 'fresh'), 'fresh')
+        self.assertEqual(self.client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk])
+        ).json()['comment_count'], 1)
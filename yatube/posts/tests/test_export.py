@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Котики', slug='cats')
+        cls.posts = [Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                         group=group if i % 2 else None)
+                     for i in range(5)]
+        for post in cls.posts[:2]:
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text=f'К посту {post.pk}')
+        Post.objects.create(author=cls.reader, text='Чужой')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse('posts:profile_export', args=['author'])
+
+    def test_lines(self):
+        with self.assertNumQueries(4):
+            records = [json.loads(line)
+                       for line in export.export_lines(self.author, 2)]
+        self.assertEqual([r['text'] for r in records],
+                         [f'Пост {i}' for i in range(5)])
+        self.assertEqual(records[1]['group'], 'cats')
+        self.assertEqual(records[0]['comments'], [{
+            'author': 'reader',
+            'text': f'К посту {self.posts[0].pk}',
+            'created': records[0]['comments'][0]['created'],
+        }])
+        self.assertEqual(records[4]['comments'], [])
+
+    def test_view_streams_jsonl(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['author'], 'author')
+
+    def test_view_gzips_on_request(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 5)
+
+    def test_only_author_exports(self):
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        response = Client().get(self.url)
+        self.assertRedirects(response, f'/auth/login/?next={self.url}')
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'author.jsonl.gz')
+            call_command('export_content', 'author', output=path,
+                         gzip=True, chunk_size=2)
+            with gzip.open(path, 'rt', encoding='utf-8') as source:
+                records = [json.loads(line) for line in source]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[1]['comments'][0]['author'], 'reader')
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedEngineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        cls.stranger = User.objects.create_user(username='stranger')
+        for i in range(9):
+            for author in (*cls.authors, cls.stranger):
+                Post.objects.create(text=f'Post {i}', author=author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def walk(self):
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        pages = []
+        while True:
+            page_obj = response.context['page_obj']
+            pages.append(list(page_obj))
+            cursor = page_obj.paginator.next_cursor
+            if cursor is None:
+                return pages
+            response = self.client.get(url + f'?after={cursor}')
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__following__user=self.reader).order_by(
+            '-pub_date', '-pk'))
+
+    def check_engine(self):
+        for author in self.authors[:2]:
+            self.client.get(reverse('posts:profile_follow',
+                                    args=(author.username,)))
+        Post.objects.create(text='Fresh', author=self.authors[0])
+        pages = self.walk()
+        self.assertEqual(sum(pages, []), self.expected())
+        self.assertEqual(len(pages[0]), 10)
+        self.client.get(reverse('posts:profile_unfollow',
+                                args=(self.authors[0].username,)))
+        self.assertEqual(sum(self.walk(), []), self.expected())
+
+    @override_settings(FOLLOW_FEED_ENGINE='timeline')
+    def test_timeline_engine(self):
+        """Timeline feed matches the Follow/Post join."""
+        self.check_engine()
+
+    @override_settings(FOLLOW_FEED_ENGINE='pull')
+    def test_pull_engine(self):
+        """Heap-merged feed matches the Follow/Post join."""
+        self.check_engine()
+
+    @override_settings(FOLLOW_FEED_ENGINE='pull')
+    def test_pull_engine_pages_back(self):
+        """Previous cursor of the pull feed returns the page before."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        url = reverse('posts:follow_index')
+        first = self.client.get(url).context['page_obj']
+        cursor = first.paginator.next_cursor
+        second = self.client.get(url + f'?after={cursor}').context['page_obj']
+        cursor = second.paginator.previous_cursor
+        back = self.client.get(url + f'?before={cursor}').context['page_obj']
+        self.assertEqual(list(back), list(first))
+        third = self.client.get(url + '?page=2').context['page_obj']
+        self.assertEqual(list(third), list(second))
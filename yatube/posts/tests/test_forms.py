@@ -1,5 +1,6 @@
 import tempfile
 import shutil
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -7,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts.forms import PostForm
 from posts.models import Post, Group, Comment
 
 
@@ -95,11 +97,30 @@ class PostFormTests(TestCase):
                 text=form_data['text'],
                 group=self.group.id,
                 author=self.user,
-                image='posts/small.gif'
+                image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
 
             ).exists()
         )
 
+    def test_edit_keeps_comments_added_meanwhile(self):
+        """A comment added while the post is edited stays counted."""
+        is_valid = PostForm.is_valid
+
+        def comment_first(form):
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Meanwhile')
+            return is_valid(form)
+
+        count = Post.objects.get(pk=self.post.pk).comment_count
+        with mock.patch.object(PostForm, 'is_valid', comment_first):
+            self.authorized_client.post(
+                reverse('posts:update_post',
+                        kwargs={'post_id': self.post.id}),
+                data={'text': 'Edited while commented'})
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Edited while commented')
+        self.assertEqual(post.comment_count, count + 1)
+
     def test_edit_post(self):
         """Check changing post after editing."""
         second_form_data = {
@@ -126,7 +147,7 @@ class PostFormTests(TestCase):
                 group=self.second_group.id,
                 author=self.user,
                 id=self.post.id,
-                image='posts/small_2.gif'
+                image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
             ).exists()
         )
 
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import group_index
+from posts.forms import PostForm
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class GroupAutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Group.objects.create(title='Любители котиков',
+                                        slug='cat-lovers')
+        cls.dogs = Group.objects.create(title='Собаки', slug='dogs')
+        for i in range(20):
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_prefix_search(self):
+        self.assertEqual(group_index.search('кот'),
+                         [(self.cats.pk, self.cats.title)])
+        self.assertEqual(group_index.search('CAT'),
+                         [(self.cats.pk, self.cats.title)])
+        self.assertEqual(group_index.search('люБители К'),
+                         [(self.cats.pk, self.cats.title)])
+        self.assertEqual(len(group_index.search('груп')), 10)
+        self.assertEqual(group_index.search('кошки'), [])
+
+    def test_index_follows_group_changes(self):
+        group_index.search('кот')
+        self.dogs.title = 'Котопсы'
+        self.dogs.save()
+        self.assertEqual({pk for pk, _ in group_index.search('кот')},
+                         {self.cats.pk, self.dogs.pk})
+        self.dogs.delete()
+        self.assertEqual(group_index.search('котопс'), [])
+
+    def test_autocomplete_endpoint(self):
+        response = self.client.get(reverse('posts:group_autocomplete'),
+                                   {'q': 'соб'})
+        self.assertEqual(response.json(), {
+            'results': [{'id': self.dogs.pk, 'text': 'Собаки'}]})
+
+    def test_form_renders_only_chosen_group(self):
+        post = Post.objects.create(author=self.user, text='Text',
+                                   group=self.dogs)
+        with self.assertNumQueries(1):
+            html = PostForm(instance=post)['group'].as_widget()
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn('Собаки', html)
+        self.assertIn('data-autocomplete-url', html)
+        html = PostForm()['group'].as_widget()
+        self.assertEqual(html.count('<option'), 1)
+
+    def test_any_group_id_validates(self):
+        form = PostForm({'text': 'Text', 'group': self.cats.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.cats)
+        form = PostForm({'text': 'Text', 'group': 10 ** 6})
+        self.assertFalse(form.is_valid())
+
+    def test_non_numeric_group_is_a_form_error(self):
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Text', 'group': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['group'])
+        self.assertEqual(
+            response.content.decode().count('<option'), 1)
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,156 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import counters, search
+from posts.models import Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.reader = User.objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as target:
+            target.write(text)
+        return path
+
+    def jsonl(self, name, records):
+        return self.write(name, ''.join(json.dumps(record) + '\n'
+                                        for record in records))
+
+    def call(self, *args, **kwargs):
+        out = StringIO()
+        call_command('import_content', *args, stdout=out, **kwargs)
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        path = self.jsonl('content.jsonl', [
+            {'type': 'user', 'username': 'leo', 'first_name': 'Лев'},
+            {'type': 'group', 'title': 'Котики', 'slug': 'cats'},
+            {'type': 'follow', 'user': 'reader', 'author': 'leo'},
+            {'type': 'post', 'author': 'leo', 'group': 'cats',
+             'text': 'Пушистые котики', 'pub_date': '2020-01-02T03:04:05'},
+            {'type': 'post', 'author': 'leo', 'text': 'Без группы'},
+            {'type': 'post', 'author': 'nobody', 'text': 'Чужой'},
+            {'type': 'follow', 'user': 'leo', 'author': 'leo'},
+        ])
+        out = self.call(path, batch_size=2)
+        self.assertIn('rows/s', out)
+        self.assertIn('post: 2 imported, 1 skipped', out)
+        self.assertIn('follow: 1 imported, 1 skipped', out)
+
+        leo = User.objects.get(username='leo')
+        self.assertFalse(leo.has_usable_password())
+        post = Post.objects.get(group__slug='cats')
+        self.assertEqual(post.author, leo)
+        self.assertEqual(post.pub_date, timezone.make_aware(
+            datetime(2020, 1, 2, 3, 4, 5)))
+        self.assertEqual([r.pk for r in search.search('котик', 10).results],
+                         [post.pk])
+        self.assertEqual(counters.user_stats(leo).posts_count, 2)
+        self.assertEqual(counters.user_stats(leo).followers_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+
+    @override_settings(TIMELINE_LIM=2)
+    def test_timelines_are_trimmed(self):
+        path = self.jsonl('feed.jsonl', [
+            {'type': 'user', 'username': 'tom'},
+            {'type': 'follow', 'user': 'reader', 'author': 'tom'},
+            *({'type': 'post', 'author': 'tom', 'text': f'Пост {i}',
+               'pub_date': f'2020-01-0{i}T00:00:00'} for i in range(1, 6)),
+        ])
+        self.call(path, batch_size=2)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader)
+                 .values_list('post__text', flat=True)),
+            ['Пост 5', 'Пост 4'])
+
+    def test_import_csv_with_type(self):
+        Group.objects.create(title='Собаки', slug='dogs')
+        users = self.write('users.csv.gz', 'username,email\nann,a@b.c\n')
+        posts = self.write('posts.csv', 'author,group,text\n'
+                                        'ann,dogs,Гав\nann,,Мяу\n')
+        self.call(users, type='user')
+        self.call(posts, type='post')
+        self.assertEqual(User.objects.get(username='ann').email, 'a@b.c')
+        self.assertEqual(Post.objects.filter(author__username='ann',
+                                             group__slug='dogs').count(), 1)
+        self.assertEqual(Post.objects.filter(author__username='ann').count(),
+                         2)
+
+    def test_existing_rows_are_kept(self):
+        path = self.jsonl('again.jsonl', [
+            {'type': 'user', 'username': 'reader', 'email': 'new@b.c'},
+            {'type': 'follow', 'user': 'reader', 'author': 'reader'},
+        ])
+        self.call(path)
+        self.call(path)
+        self.assertEqual(User.objects.get(username='reader').email, '')
+        self.assertFalse(Follow.objects.exists())
+
+    def test_existing_rows_are_counted_as_skipped(self):
+        path = self.jsonl('users.jsonl', [
+            {'type': 'user', 'username': 'reader'},
+            {'type': 'user', 'username': 'ann'},
+            {'type': 'user', 'username': 'ann'},
+            {'type': 'follow', 'user': 'reader', 'author': 'ann'},
+        ])
+        self.assertIn('user: 1 imported, 2 skipped', self.call(path))
+        out = self.call(path)
+        self.assertIn('user: 0 imported, 3 skipped', out)
+        self.assertIn('follow: 0 imported, 1 skipped', out)
+
+    def test_failed_batch_still_finishes(self):
+        self.client.get('/')
+        path = self.jsonl('broken.jsonl', [
+            {'type': 'post', 'author': 'reader', 'text': 'Первый'},
+            {'type': 'post', 'author': 'reader', 'text': 'Второй'},
+            {'type': 'post', 'author': 'reader', 'text': 'Плохой',
+             'pub_date': 'вчера'},
+        ])
+        with self.assertRaisesMessage(CommandError, 'pub_date'):
+            self.call(path, batch_size=2)
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(counters.user_stats(reader).posts_count, 2)
+        self.assertIsNone(cache.get(counters.post_count_key('index')))
+        self.assertContains(self.client.get('/'), 'Второй')
+
+    def test_feed_counter_is_refreshed(self):
+        self.client.get('/')
+        path = self.jsonl('one.jsonl', [
+            {'type': 'post', 'author': 'reader', 'text': 'Новый'}])
+        self.call(path)
+        self.assertIsNone(cache.get(counters.post_count_key('index')))
+        self.assertContains(self.client.get('/'), 'Новый')
+
+    def test_unknown_type(self):
+        path = self.jsonl('bad.jsonl', [{'type': 'comment'}])
+        with self.assertRaisesMessage(CommandError, 'comment'):
+            self.call(path)
@@ -1,7 +1,16 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image, features
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -25,3 +34,134 @@ class PostModelTest(TestCase):
         """Проверяем, что у моделей корректно работает __str__."""
         self.assertEqual(self.group.title, str(self.group))
         self.assertEqual(self.post.text[:15], str(self.post))
+
+
+class CommentCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def comment_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_comment_count_follows_comments(self):
+        """comment_count grows on new comments and shrinks on delete."""
+        comments = [Comment.objects.create(post=self.post, author=self.user,
+                                           text=str(i)) for i in range(3)]
+        self.assertEqual(self.comment_count(), 3)
+        comments[0].delete()
+        Comment.objects.filter(pk=comments[1].pk).delete()
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_reconcile_counters(self):
+        """reconcile_counters fixes drifted comment_count."""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.comment_count(), 1)
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_stats_follow_posts_and_follows(self):
+        """UserStats counters follow Post and Follow changes."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_deleting_user_keeps_stats_consistent(self):
+        """Deleting a user with posts and follows does not break stats."""
+        leaving = User.objects.create_user(username='leaving')
+        Post.objects.create(author=leaving, text='Пост')
+        Follow.objects.create(user=leaving, author=self.author)
+        leaving_id = leaving.pk
+        leaving.delete()
+        self.assertFalse(UserStats.objects.filter(
+            user_id=leaving_id).exists())
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_reconcile_rebuilds_stats(self):
+        """reconcile_counters recreates missing and drifted stats."""
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).delete()
+        UserStats.objects.filter(user=self.reader).update(posts_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_UPLOAD_MAX_SIDE=1000)
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name, size, fmt, **params):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (255, 0, 0, 128)).save(buffer, fmt, **params)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_upload_is_normalized(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees.
+        post = Post.objects.create(
+            author=self.user,
+            text='Text',
+            image=self.upload('photo.png', (3000, 1500), 'PNG', exif=exif),
+        )
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (500, 1000))
+        with post.image.open() as file:
+            image = Image.open(file)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (500, 1000))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertNotIn('exif', image.info)
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    @override_settings(IMAGE_UPLOAD_FORMAT='WEBP')
+    def test_webp_keeps_transparency(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Text',
+            image=self.upload('photo.png', (200, 100), 'PNG'),
+        )
+        self.assertTrue(post.image.name.endswith('.webp'))
+        with post.image.open() as file:
+            self.assertEqual(Image.open(file).mode, 'RGBA')
+
+    def test_stored_image_is_left_alone(self):
+        post = Post.objects.create(author=self.user, text='Text',
+                                   image='posts/missing.jpg')
+        post.text = 'Edited'
+        post.save()
+        self.assertIsNone(post.image_width)
+        post.image = None
+        post.save()
+        self.assertEqual(post.image.name, None)
@@ -5,7 +5,10 @@ from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
 
+from core.paginator import CachedCountPaginator, CursorPaginator
+from posts.counters import post_count_key
 from posts.models import Post, Group
 
 User = get_user_model()
@@ -34,6 +37,9 @@ class PostPagesTests(TestCase):
         self.authorized_client = Client()
         self.authorized_client.force_login(PostPagesTests.user)
 
+    def tearDown(self):
+        cache.clear()
+
     def test_paginator(self):
         """Check paginator contains right number of posts."""
         page_num = ceil(self.PAGE_COUNT / settings.POST_LIM)
@@ -54,3 +60,76 @@ class PostPagesTests(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']),
                     (self.PAGE_COUNT - ((page_num - 1) * settings.POST_LIM)))
+
+    def test_cursor_pages_cover_feed(self):
+        """Following next cursors walks the whole feed without gaps."""
+        for _ in range(self.PAGE_COUNT):
+            Post.objects.create(
+                text=uuid.uuid4(),
+                author=self.user,
+                group=self.group,
+            )
+        for url in self.urls:
+            with self.subTest(url=url):
+                seen = []
+                response = self.authorized_client.get(url)
+                while True:
+                    seen += list(response.context['page_obj'])
+                    cursor = response.context['page_obj'].paginator.next_cursor
+                    if cursor is None:
+                        break
+                    response = self.authorized_client.get(
+                        url + f'?after={cursor}')
+                self.assertEqual(seen, list(Post.objects.all()))
+
+    def test_cursor_page_skips_count(self):
+        """Cursor pages are fetched by one keyset query, without COUNT."""
+        for _ in range(self.PAGE_COUNT):
+            Post.objects.create(text=uuid.uuid4(), author=self.user)
+        paginator = CursorPaginator(Post.objects.all(), settings.POST_LIM)
+        with self.assertNumQueries(1):
+            first = paginator.get_page()
+        paginator = CursorPaginator(Post.objects.all(), settings.POST_LIM)
+        with self.assertNumQueries(1):
+            second = paginator.get_page(after=first.paginator.next_cursor)
+        self.assertEqual(second.number, 2)
+        self.assertEqual(len(second),
+                         self.PAGE_COUNT - settings.POST_LIM)
+        self.assertIsNone(paginator.next_cursor)
+        paginator = CursorPaginator(Post.objects.all(), settings.POST_LIM)
+        back = paginator.get_page(before=second.paginator.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+
+    def test_page_window(self):
+        """Page links are limited to the ends and a window around."""
+        paginator = CachedCountPaginator(Post.objects.all(), 10)
+        paginator.count = 1000
+        self.assertEqual(paginator.get_page_window(1),
+                         [1, 2, 3, 4, None, 100])
+        self.assertEqual(paginator.get_page_window(50),
+                         [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100])
+        paginator = CachedCountPaginator(Post.objects.all(), 10)
+        paginator.count = 30
+        self.assertEqual(paginator.get_page_window(2), [1, 2, 3])
+
+    def test_cached_count_follows_signals(self):
+        """Counter is read from the cache and kept current by signals."""
+        Post.objects.create(text='first', author=self.user)
+        key = post_count_key('group', self.group.pk)
+        paginator = CachedCountPaginator(self.group.posts.all(), 10,
+                                         count_key=key)
+        self.assertEqual(paginator.count, 0)
+        post = Post.objects.create(text='second', author=self.user,
+                                   group=self.group)
+        paginator = CachedCountPaginator(self.group.posts.all(), 10,
+                                         count_key=key)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 1)
+        post.group = None
+        post.save()
+        self.assertEqual(cache.get(key), 0)
+        Post.objects.create(text='third', author=self.user,
+                            group=self.group)
+        Post.objects.filter(group=self.group).delete()
+        self.assertEqual(cache.get(key), 0)
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class QueryPlanTest(TestCase):
+    """Every query of the feed pages must be served by an index.
+
+    Plans come from ``EXPLAIN QUERY PLAN`` of the captured queries; a
+    table scan is only accepted for queries without a WHERE clause,
+    i.e. the first page of the index and its total.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Котики', slug='cats')
+        cls.posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                         text=f'Запись {i}')
+                     for i in range(12)]
+        cls.post = cls.posts[0]
+        for i in range(12):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assertIndexed(self, url, data=None):
+        """Fetch ``url`` and check the plans of its queries; return the
+        response."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    with self.subTest(url=url, sql=sql, plan=detail):
+                        self.assertNotIn('TEMP B-TREE', detail)
+                        if detail.startswith('SCAN'):
+                            self.assertNotIn(' WHERE ', sql)
+        return response
+
+    def assertPagesIndexed(self, url):
+        response = self.assertIndexed(url)
+        cursor = response.context['page_obj'].paginator.next_cursor
+        self.assertIsNotNone(cursor)
+        self.assertIndexed(url, {'after': cursor})
+
+    def test_post_pages(self):
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_list', args=['cats']),
+                    reverse('posts:profile', args=['author'])):
+            with self.subTest(url=url):
+                self.assertPagesIndexed(url)
+
+    def test_post_detail(self):
+        self.assertIndexed(reverse('posts:post_detail', args=[self.post.pk]))
+
+    def test_follow_index(self):
+        for engine in ('timeline', 'pull'):
+            with self.subTest(engine=engine), \
+                    override_settings(FOLLOW_FEED_ENGINE=engine):
+                self.assertPagesIndexed(reverse('posts:follow_index'))
+
+    def test_api(self):
+        urls = [
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', args=['cats']),
+            reverse('posts:api_profile_posts', args=['author']),
+            reverse('posts:api_comments', args=[self.post.pk]),
+            reverse('posts:api_follow'),
+        ]
+        for engine in ('timeline', 'pull'):
+            for url in urls:
+                with self.subTest(engine=engine, url=url), \
+                        override_settings(FOLLOW_FEED_ENGINE=engine):
+                    cache.clear()
+                    page = self.assertIndexed(url).json()
+                    self.assertIsNotNone(page['next'])
+                    self.assertIndexed(page['next'])
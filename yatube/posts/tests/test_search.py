@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.tasks import run_pending
+from posts import search
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Котики', slug='cats')
+        cls.cats = Post.objects.create(
+            author=cls.author,
+            text='Котики спят весь день, а ночью котики бегают.',
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.author,
+            text='Собаки гуляют с котиком <b>утром</b>.',
+            group=cls.group,
+        )
+        cls.other = Post.objects.create(author=cls.author,
+                                        text='Просто текст.')
+
+    def ids(self, query, **kwargs):
+        return [result.pk for result in search.search(query, 10, **kwargs)
+                .results]
+
+    def test_ranked_matches(self):
+        self.assertEqual(self.ids('спят'), [self.cats.pk])
+        self.assertEqual(self.ids('котик'), [self.cats.pk, self.dogs.pk])
+        self.assertEqual(self.ids('нет такого слова'), [])
+        self.assertEqual(self.ids('!!!'), [])
+
+    def test_group_title_is_searched(self):
+        self.assertEqual(self.ids('КОТИКИ'), [self.cats.pk, self.dogs.pk])
+
+    def test_index_follows_posts_and_groups(self):
+        self.other.text = 'Теперь про енотов'
+        self.other.save()
+        self.assertEqual(self.ids('енотов'), [self.other.pk])
+        self.group.title = 'Пёсики'
+        self.group.save()
+        self.assertEqual(self.ids('пёсики'), [self.dogs.pk])
+        self.group.delete()
+        self.assertEqual(self.ids('пёсики'), [])
+        self.other.delete()
+        run_pending()
+        self.assertEqual(self.ids('енотов'), [])
+
+    def test_snippets_are_highlighted_and_escaped(self):
+        result, = search.search('утром', 10).results
+        self.assertIn('<mark>утром</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+
+    def test_cursor_pagination(self):
+        first = search.search('котик', 1)
+        self.assertEqual([r.pk for r in first.results], [self.cats.pk])
+        second = search.search('котик', 1, after=first.next_cursor)
+        self.assertEqual([r.pk for r in second.results], [self.dogs.pk])
+        self.assertIsNone(second.next_cursor)
+
+    def test_rebuild_search_index(self):
+        search.unindex_post(self.cats.pk)
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 posts', out.getvalue())
+        self.assertEqual(self.ids('спят'), [self.cats.pk])
+
+    def test_search_page(self):
+        response = Client().get(reverse('posts:search'), {'q': 'котик'})
+        self.assertEqual([post.pk for post in response.context['results']],
+                         [self.cats.pk, self.dogs.pk])
+        self.assertContains(response, '<mark>')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'котики'})
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.cats.pk, self.dogs.pk})
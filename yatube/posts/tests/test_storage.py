@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import images
+from core.models import Task
+from core.tasks import run_pending
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_RELEASE_GRACE=0,
+                   IMAGE_RESIZE_ROOT=os.path.join(TEMP_MEDIA_ROOT, 'resized'))
+class DeduplicatedImagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Text',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def exists(self, post):
+        return post.image.storage.exists(post.image.name)
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first.image.name)])
+
+    def test_blob_lives_until_last_post_goes(self):
+        first = self.create_post()
+        second = self.create_post()
+        thumbnails.generate(first.image.name)
+        first.delete()
+        run_pending()
+        self.assertTrue(self.exists(second))
+        self.assertEqual(thumbnails.records([second.image.name])
+                         [second.image.name].keys(), thumbnails.SPECS.keys())
+        second.delete()
+        self.assertTrue(self.exists(second))
+        run_pending()
+        self.assertFalse(self.exists(second))
+        self.assertEqual(
+            thumbnails.records([second.image.name])[second.image.name], {})
+
+    def test_resized_copies_go_with_the_image(self):
+        post = self.create_post()
+        name = post.image.name
+        url = images.resized_url(name, 2, 1, 'fit')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        rendition = images.cache_path(images.content_digest(name), 2, 1,
+                                      'fit')
+        self.assertTrue(os.path.exists(rendition))
+        post.delete()
+        run_pending()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertFalse(os.path.exists(rendition))
+        self.assertIsNone(cache.get(images.digest_key(name)))
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post()
+        old = post.image.name
+        post.image = None
+        post.save()
+        run_pending()
+        self.assertFalse(post.image.storage.exists(old))
+
+    def test_upload_racing_the_release_keeps_the_file(self):
+        post = self.create_post()
+        name = post.image.name
+        Post.objects.filter(pk=post.pk).delete()
+        storage = post.image.storage
+        set_aside = storage.set_aside
+
+        def upload_meanwhile(name):
+            # The same content is posted after the first reference check.
+            self.create_post()
+            return set_aside(name)
+
+        with mock.patch.object(storage, 'set_aside', upload_meanwhile):
+            thumbnails.release(name)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(os.listdir(os.path.dirname(storage.path(name))),
+                         [os.path.basename(name)])
+
+    @override_settings(IMAGE_RELEASE_GRACE=600)
+    def test_recently_reused_file_is_released_later(self):
+        post = self.create_post()
+        name = post.image.name
+        # The file was just stored, as if an upload of a post that is
+        # not committed yet had reused it.
+        post.delete()
+        run_pending()
+        self.assertTrue(post.image.storage.exists(name))
+        self.assertTrue(Task.objects.filter(
+            name=thumbnails.release.name, run_at__gt=timezone.now(),
+        ).exists())
+
+    def test_upload_after_release_stores_the_file_again(self):
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        run_pending()
+        self.assertFalse(post.image.storage.exists(name))
+        self.assertEqual(self.create_post().image.name, name)
+        self.assertTrue(post.image.storage.exists(name))
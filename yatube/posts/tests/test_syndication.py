@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import cache_tags
+from posts import syndication
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Лев')
+        cls.group = Group.objects.create(title='Котики', slug='cats',
+                                         description='Про котиков')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Котики <спят> весь день')
+        Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_list_posts(self):
+        urls = {
+            reverse('posts:index_feed', args=['rss']): 2,
+            reverse('posts:index_feed', args=['atom']): 2,
+            reverse('posts:group_feed', args=['cats', 'rss']): 1,
+            reverse('posts:profile_feed', args=['author', 'atom']): 2,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                content = response.content.decode()
+                self.assertIn(reverse('posts:post_detail',
+                                      args=[self.post.pk]), content)
+                self.assertIn('Котики &lt;спят&gt; весь день', content)
+                self.assertEqual(
+                    content.count('<item>') + content.count('<entry>'),
+                    count)
+
+    def test_missing_group(self):
+        response = self.client.get(
+            reverse('posts:group_feed', args=['dogs', 'rss']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_skips_database(self):
+        url = reverse('posts:index_feed', args=['rss'])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        again = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_cached_feed_is_served_without_rendering(self):
+        url = reverse('posts:group_feed', args=['cats', 'atom'])
+        first = self.client.get(url)
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_cached_feeds_expire(self):
+        with mock.patch.object(cache_tags, 'get_or_set',
+                               wraps=cache_tags.get_or_set) as get_or_set:
+            self.client.get(reverse('posts:group_feed', args=['cats', 'rss']))
+        self.assertEqual(
+            {call[1]['timeout'] for call in get_or_set.call_args_list},
+            {syndication.CACHE_TIMEOUT})
+
+    def test_new_and_deleted_posts_change_the_feed(self):
+        url = reverse('posts:profile_feed', args=['author', 'rss'])
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Свежий пост')
+        etag = response['ETag']
+        post.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Свежий пост')
+
+    def test_pages_link_their_feeds(self):
+        response = self.client.get(reverse('posts:group_list',
+                                           args=['cats']))
+        self.assertContains(response, 'href="/group/cats/rss/"')
+        self.assertContains(response, 'href="/group/cats/atom/"')
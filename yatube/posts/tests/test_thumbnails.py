@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import images
+from core.models import Task
+from core.tasks import run_pending
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Text',
+            author=cls.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Records attached by earlier tests must not leak in.
+        self.post = Post.objects.get(pk=ThumbnailsTest.post.pk)
+
+    def test_lookup_never_resizes(self):
+        """A missing rendition falls back to the resize endpoint and is
+        enqueued instead of being generated in the request."""
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue, \
+                mock.patch.object(thumbnails.backend,
+                                  'get_thumbnail') as get_thumbnail:
+            im = thumbnails.lookup(self.post, 'card')
+            thumbnails.lookup(self.post, 'card')
+        self.assertEqual(im.url, images.resized_url(
+            self.post.image.name, 960, 339, 'crop'))
+        # The 2x1 GIF is cropped to the card's proportions, not upscaled.
+        self.assertEqual((im.width, im.height), (2, 1))
+        enqueue.assert_called_once_with(self.post)
+        get_thumbnail.assert_not_called()
+
+    def test_enqueued_renditions_are_rendered_by_worker(self):
+        thumbnails.enqueue(self.post)
+        self.assertEqual(Task.objects.get().name, 'posts.thumbnails.render')
+        run_pending()
+        self.assertIsNotNone(thumbnails.lookup(self.post, 'card').width)
+
+    def test_generated_renditions_are_looked_up(self):
+        thumbnails.generate(self.post.image.name)
+        for spec in thumbnails.SPECS:
+            with self.subTest(spec=spec):
+                im = thumbnails.lookup(self.post, spec)
+                self.assertIsNotNone(im.width)
+
+    def test_prefetch_makes_one_cache_call_per_page(self):
+        posts = [self.post, *(
+            Post.objects.create(
+                text='Text',
+                author=self.author,
+                image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                         'image/gif'),
+            ) for _ in range(3))]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        posts = list(Post.objects.filter(pk__in=[post.pk for post in posts]))
+        with mock.patch('posts.thumbnails.cache', wraps=cache) as spy, \
+                mock.patch.object(thumbnails.backend, 'lookup') as lookup:
+            thumbnails.prefetch(posts)
+            ims = [thumbnails.lookup(post, spec)
+                   for post in posts for spec in thumbnails.SPECS]
+        self.assertEqual(spy.method_calls, [mock.call.get_many(mock.ANY)])
+        lookup.assert_not_called()
+        self.assertNotIn(None, [im.width for im in ims])
+
+    def test_missing_renditions_are_remembered(self):
+        """Pages do not ask sorl again while renditions are pending."""
+        with mock.patch.object(thumbnails, 'enqueue'):
+            thumbnails.lookup(self.post, 'card')
+            post = Post.objects.get(pk=self.post.pk)
+            with mock.patch.object(thumbnails.backend, 'lookup') as lookup:
+                im = thumbnails.lookup(post, 'card')
+        lookup.assert_not_called()
+        self.assertEqual(im.url, images.resized_url(
+            self.post.image.name, 960, 339, 'crop'))
+
+    def test_srcset_variants_and_placeholder(self):
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'blue').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            text='Text',
+            author=self.author,
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue()),
+        )
+        self.assertTrue(post.image_placeholder.startswith(
+            'data:image/jpeg;base64,'))
+        self.assertLess(len(post.image_placeholder), 1000)
+        thumbnails.generate(post.image.name)
+        post = Post.objects.get(pk=post.pk)
+        card = thumbnails.lookup(post, 'card')
+        self.assertEqual((card.width, card.height), (960, 339))
+        self.assertEqual(
+            [entry.split()[1] for entry in card.srcset.split(', ')],
+            ['320w', '640w', '960w', '1920w'])
+        detail = thumbnails.lookup(post, 'detail')
+        self.assertEqual(
+            [entry.split()[1] for entry in detail.srcset.split(', ')],
+            ['226w', '452w', '678w', '1356w'])
+        if 'WEBP' in thumbnails.FORMATS:
+            self.assertIn('1920w', card.webp_srcset)
+
+    def test_feed_renders_responsive_images(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="2" height="1"')
+
+    def test_post_without_image(self):
+        post = Post.objects.create(text='Text', author=self.author)
+        self.assertIsNone(thumbnails.lookup(post, 'card'))
+
+    def test_generate_thumbnails_command(self):
+        with mock.patch(
+                'posts.management.commands.generate_thumbnails'
+                '.ProcessPoolExecutor') as pool:
+            pool.return_value.__enter__.return_value.map = (
+                lambda func, items, chunksize: map(func, items))
+            call_command('generate_thumbnails', stdout=mock.Mock())
+        im = thumbnails.lookup(self.post, 'detail')
+        self.assertIsNotNone(im.width)
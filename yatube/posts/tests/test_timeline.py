@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.tasks import run_pending
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(text='Old', author=cls.author)
+
+    def feed(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Following copies recent posts, unfollowing removes them."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post.pk])
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fans_out(self):
+        """New post lands in every follower's feed, newest first."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='New', author=self.author)
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+
+    @override_settings(TIMELINE_LIM=2)
+    def test_feed_is_capped(self):
+        """Only the newest TIMELINE_LIM entries are kept."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=str(i), author=self.author)
+                 for i in range(3)]
+        run_pending()
+        self.assertEqual(self.feed(), [posts[2].pk, posts[1].pk])
+
+    @override_settings(TIMELINE_LIM=2)
+    def test_fan_out_is_one_statement(self):
+        """Fan-out costs the same for any number of followers; the feeds
+        are trimmed by a task."""
+        for i in range(5):
+            reader = User.objects.create_user(username=f'reader{i}')
+            Follow.objects.create(user=reader, author=self.author)
+        with override_settings(FOLLOW_FEED_ENGINE='pull'):
+            posts = [Post.objects.create(text=str(i), author=self.author)
+                     for i in range(3)]
+        for post in posts:
+            # One insert of the entries and one of the trim task.
+            with self.assertNumQueries(2):
+                timeline.fan_out(post)
+        self.assertEqual(TimelineEntry.objects.count(), 5 * 4)
+        run_pending()
+        self.assertEqual(TimelineEntry.objects.count(), 5 * 2)
+
+    def test_rebuild_command(self):
+        """rebuild_timelines restores feeds from the Follow table."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post.pk])
@@ -8,7 +8,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.core.cache import cache
 
-from posts.models import Post, Group, Follow
+from core import tasks
+from posts import search
+from posts.models import Comment, Post, Group, Follow
 from posts.forms import PostForm
 
 User = get_user_model()
@@ -126,10 +128,26 @@ class PostPagesTests(TestCase):
 
     def test_post_delete(self):
         """Check that delete_post function works correctly."""
-        self.authorized_client.post(
-            reverse('posts:delete_post', kwargs={'post_id': self.post.id})
+        for i in range(3):
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text=f'Comment {i}')
+        profile = reverse('posts:profile',
+                          kwargs={'username': self.author.username})
+        self.assertIn(self.post, self.authorized_client.get(
+            profile).context['page_obj'])
+        response = self.authorized_client.post(
+            reverse('posts:delete_post', kwargs={'post_id': self.post.id}),
+            follow=True
         )
+        self.assertNotIn(self.post, response.context['page_obj'])
         self.assertFalse(Post.objects.filter(id=self.post.id).exists())
+        self.assertFalse(Comment.objects.filter(post=self.post.id).exists())
+        # The search entry goes in the background.
+        self.assertIn(self.post.id, [
+            result.pk for result in search.search('Text', 10).results])
+        tasks.run_pending()
+        self.assertNotIn(self.post.id, [
+            result.pk for result in search.search('Text', 10).results])
 
     def test_another_group_post_does_not_maps_in_group_list(self):
         """Check that post with group does not maps in another group list."""
@@ -138,15 +156,36 @@ class PostPagesTests(TestCase):
         self.assertNotIn(self.another_group_post, response.context['page_obj'])
 
     def test_index_cache(self):
-        """Check that @cache_page works correctly."""
+        """Check that the index fragment is cached until its tags change."""
         response = self.authorized_client.get(reverse('posts:index'))
         temp = response.content
-        self.post_two.delete()
+        Post.objects.filter(pk=self.post_two.pk).update(text='Silent edit')
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(temp, response.content)
-        cache.clear()
+        self.post_two.delete()
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(temp, response.content)
+        self.assertNotIn(self.post_two, response.context['page_obj'])
+
+    def test_listing_caches_invalidated_by_tags(self):
+        """Group and profile fragments drop on new posts and comments."""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                before = self.authorized_client.get(url).content
+                Comment.objects.create(post=self.post, author=self.author,
+                                       text='Comment')
+                after = self.authorized_client.get(url).content
+                self.assertNotEqual(before, after)
+                Post.objects.create(text='Fresh post', author=self.author,
+                                    group=self.group)
+                self.assertIn('Fresh post',
+                              self.authorized_client.get(url)
+                              .content.decode())
 
     def test_profile_follow(self):
         """Check that profile_follow works correctly."""
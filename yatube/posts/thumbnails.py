@@ -0,0 +1,251 @@
+"""Thumbnails of post images.
+
+Every image box the templates show is listed in ``SPECS``; each one is
+rendered at the ``WIDTHS`` of its ``srcset`` in every format of
+``FORMATS``. Renditions are created by a background task queued with
+every post with a new image (``enqueue``) and by ``manage.py
+generate_thumbnails`` for existing posts. Templates only
+look them up (``lookup``) and point at the signed resize endpoint of
+``core.images`` while a rendition is not ready, so resizing never runs
+while HTML is rendered.
+
+URLs and sizes of all renditions of an image are kept together in one
+compact cache record, so ``prefetch`` resolves a whole page of posts
+with a single cache multi-get.
+"""
+import hashlib
+import os
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from PIL import features
+
+from core import cache_tags, images
+from core.tasks import task
+from .models import Post
+
+SPECS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': False}),
+    'detail': ('960x339', {'upscale': True}),
+}
+
+WIDTHS = (320, 640, 960, 1920)
+
+# JPEG comes first: it is the ``src`` every browser can show.
+FORMATS = ('JPEG', 'WEBP') if features.check('webp') else ('JPEG',)
+
+# How long a miss in the template waits before it enqueues the same
+# image again.
+QUEUED_TIMEOUT = 60
+
+Rendition = namedtuple('Rendition', 'url width height srcset webp_srcset')
+
+
+class Backend(ThumbnailBackend):
+    """sorl backend that can also look a thumbnail up without creating
+    it."""
+
+    def lookup(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = Backend()
+
+
+def record_key(name):
+    return f'thumbnails:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def box(spec, width=None):
+    """Return ``(width, height, mode)`` of ``spec`` scaled to ``width``."""
+    geometry, options = SPECS[spec]
+    spec_width, spec_height = map(int, geometry.split('x'))
+    width = width or spec_width
+    mode = 'crop' if options.get('crop') else 'fit'
+    return width, round(spec_height * width / spec_width), mode
+
+
+def variants(spec):
+    """Yield ``(format, geometry, options)`` of every rendition of
+    ``spec``; widths above the spec's own are never upscaled."""
+    geometry, options = SPECS[spec]
+    spec_width = int(geometry.split('x')[0])
+    for fmt in FORMATS:
+        for width in WIDTHS:
+            width, height, _ = box(spec, width)
+            yield fmt, f'{width}x{height}', {
+                **options,
+                'format': fmt,
+                'upscale': (options.get('upscale', True)
+                            and width <= spec_width),
+            }
+
+
+def build_record(name):
+    """Return the ready renditions of ``name`` as ``{spec: {'src': (url,
+    width, height), 'JPEG': srcset, 'WEBP': srcset}}``, or an empty
+    record if any of them is missing."""
+    record = {}
+    for spec, (geometry, _) in SPECS.items():
+        entry = {}
+        srcsets = {fmt: {} for fmt in FORMATS}
+        for fmt, variant, options in variants(spec):
+            thumbnail = backend.lookup(name, variant, **options)
+            if thumbnail is None:
+                return {}
+            # Small originals give several variants of the same width.
+            srcsets[fmt].setdefault(thumbnail.width, thumbnail.url)
+            if fmt == 'JPEG' and variant == geometry:
+                entry['src'] = (thumbnail.url, thumbnail.width,
+                                thumbnail.height)
+        for fmt, urls in srcsets.items():
+            entry[fmt] = ', '.join(f'{url} {width}w'
+                                   for width, url in sorted(urls.items()))
+        record[spec] = entry
+    return record
+
+
+def store_record(name, record):
+    # Empty records only stop pages from asking sorl again and again
+    # while the renditions are being generated.
+    cache.set(record_key(name), record, None if record else QUEUED_TIMEOUT)
+
+
+def records(names):
+    """Return records of the images ``names`` with one cache multi-get.
+
+    Records missing from the cache are rebuilt from sorl's key-value
+    store; images still waiting for renditions get an empty record.
+    """
+    keys = {record_key(name): name for name in names}
+    found = cache.get_many(keys)
+    for key, name in keys.items():
+        if key not in found:
+            found[key] = build_record(name)
+            store_record(name, found[key])
+    return {name: found[key] for key, name in keys.items()}
+
+
+def generate(name):
+    """Create every rendition of every spec of the image ``name``."""
+    for spec in SPECS:
+        for _, geometry, options in variants(spec):
+            backend.get_thumbnail(name, geometry, **options)
+    store_record(name, build_record(name))
+
+
+@task
+def render(name, tags):
+    """Generate renditions of ``name`` and drop cached listings tagged
+    ``tags`` that show the image."""
+    generate(name)
+    cache_tags.bump(*tags)
+
+
+def enqueue(post):
+    """Queue the renditions of ``post.image``."""
+    if not post.image:
+        return
+    from .signals import post_tags
+    render.enqueue(post.image.name, post_tags(post))
+
+
+def prefetch(posts):
+    """Attach thumbnail records to ``posts`` for later ``lookup`` calls."""
+    posts = [post for post in posts if post.image]
+    found = records({post.image.name for post in posts})
+    for post in posts:
+        post._thumbnail_record = found[post.image.name]
+
+
+def lookup(post, spec):
+    """Return the ready rendition ``spec`` of ``post.image``.
+
+    Falls back to resize endpoint URLs and enqueues the renditions when
+    they are missing.
+    """
+    if not post.image:
+        return None
+    if not hasattr(post, '_thumbnail_record'):
+        prefetch([post])
+    entry = post._thumbnail_record.get(spec)
+    if entry is not None:
+        return Rendition(*entry['src'], entry['JPEG'], entry.get('WEBP'))
+    if cache.add(f'thumbnails:queued:{post.image.name}', True,
+                 QUEUED_TIMEOUT):
+        enqueue(post)
+    return _resized(post, spec)
+
+
+def _resized(post, spec):
+    def size(width, height, mode):
+        if post.image_width is None:
+            return None, None
+        return images.fitted_size(post.image_width, post.image_height,
+                                  width, height, mode)
+
+    srcset = {}
+    for width in WIDTHS:
+        resized_width = size(*box(spec, width))[0] or width
+        srcset.setdefault(resized_width, images.resized_url(
+            post.image.name, *box(spec, width)))
+    srcset = ', '.join(f'{url} {width}w'
+                       for width, url in sorted(srcset.items()))
+    width, height, mode = box(spec)
+    return Rendition(images.resized_url(post.image.name, width, height, mode),
+                     *size(width, height, mode), srcset, None)
+
+
+@task
+def release(name):
+    """Delete the image ``name``, its thumbnails and resized copies
+    unless a post still uses it.
+
+    Post images are content addressed, so one file can be shared by
+    many posts; the posts referencing it are its reference count. The
+    file is set aside before the references are counted again: an
+    upload of the same content that comes later stores its own copy,
+    and one that reused the file shortly before keeps it for
+    ``IMAGE_RELEASE_GRACE`` seconds, so its post can commit.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    storage = Post._meta.get_field('image').storage
+    try:
+        aside = storage.set_aside(name)
+    except SuspiciousFileOperation:
+        # Not a file of our storage, e.g. an absolute path.
+        aside = None
+    if aside is not None:
+        path, reused = aside
+        if Post.objects.filter(image=name).exists():
+            storage.put_back(name, path)
+            return
+        if time.time() - reused < settings.IMAGE_RELEASE_GRACE:
+            storage.put_back(name, path)
+            release.enqueue_in(settings.IMAGE_RELEASE_GRACE, name)
+            return
+        images.forget(name, path)
+        os.remove(path)
+    else:
+        images.forget(name)
+    default.kvstore.delete(ImageFile(name))
+    cache.delete(record_key(name))
@@ -0,0 +1,114 @@
+"""Fan-out-on-write follow feeds.
+
+Every new post is copied into the ``TimelineEntry`` rows of its
+author's followers, so ``follow_index`` reads one index range instead
+of joining Follow and Post. Each feed keeps at most
+``settings.TIMELINE_LIM`` newest entries; feeds of a new post's
+readers are trimmed by a background task. Feeds are only maintained
+while ``settings.FOLLOW_FEED_ENGINE`` is ``'timeline'``; run
+``rebuild_timelines`` after switching back to it.
+"""
+from django.conf import settings
+from django.db import connection
+
+from core.tasks import task
+from .models import Follow, Post, TimelineEntry
+
+
+def _trim_where(condition, params):
+    """Drop entries beyond the per-user cap from the feeds of the users
+    matching ``condition`` on ``user_id``, in one statement."""
+    table = TimelineEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+            f'PARTITION BY user_id ORDER BY pub_date DESC, id DESC) AS n '
+            f'FROM {table} WHERE {condition}) WHERE n > %s)',
+            [*params, settings.TIMELINE_LIM])
+
+
+def trim(user_id):
+    """Drop entries beyond the per-user cap."""
+    _trim_where('user_id = %s', [user_id])
+
+
+@task
+def trim_followers(author_id):
+    """Drop entries beyond the cap from the feeds of the author's
+    followers."""
+    _trim_where(
+        f'user_id IN (SELECT user_id FROM {Follow._meta.db_table} '
+        f'WHERE author_id = %s)', [author_id])
+
+
+def fan_out(post):
+    """Push a new post into the feeds of its author's followers.
+
+    The entries are inserted with one statement, so readers see the
+    post at once; trimming the feeds is left to a task.
+    """
+    if _insert_entries(
+            f'SELECT user_id, %s, %s FROM {Follow._meta.db_table} '
+            f'WHERE author_id = %s',
+            [post.pk, post.pub_date, post.author_id]):
+        trim_followers.enqueue(post.author_id)
+
+
+def _insert_entries(select, params):
+    """Insert the ``(user_id, post_id, pub_date)`` rows of ``select``,
+    skipping entries that exist; return how many were inserted."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{TimelineEntry._meta.db_table} (user_id, post_id, pub_date) '
+            f'{select} {connection.ops.ignore_conflicts_suffix_sql(True)}',
+            params)
+        return cursor.rowcount
+
+
+def fan_out_since(post_pk):
+    """Push every post newer than ``post_pk`` into the feeds of its
+    author's followers in one statement; for bulk jobs, which trim the
+    feeds afterwards."""
+    _insert_entries(
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Post._meta.db_table} p JOIN {Follow._meta.db_table} f '
+        f'ON f.author_id = p.author_id WHERE p.id > %s', [post_pk])
+
+
+def backfill_since(author_id, follow_pk):
+    """Copy the author's recent posts into the feeds of followers added
+    after follow ``follow_pk`` in one statement."""
+    _insert_entries(
+        f'SELECT f.user_id, p.id, p.pub_date FROM {Follow._meta.db_table} f '
+        f'JOIN (SELECT id, pub_date FROM {Post._meta.db_table} '
+        f'WHERE author_id = %s ORDER BY pub_date DESC LIMIT %s) p '
+        f'WHERE f.author_id = %s AND f.id > %s',
+        [author_id, settings.TIMELINE_LIM, author_id, follow_pk])
+
+
+def backfill(user_id, author_id):
+    """Copy the author's recent posts into a new follower's feed."""
+    recent = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pk', 'pub_date')[:settings.TIMELINE_LIM]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in recent],
+        ignore_conflicts=True
+    )
+    trim(user_id)
+
+
+def remove(user_id, author_id):
+    """Take an unfollowed author's posts out of the feed."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    author_ids = Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)
+    for author_id in author_ids:
+        backfill(user_id, author_id)
@@ -1,15 +1,24 @@
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
-from . import views
+from . import api, syndication, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    re_path(r'^(?P<fmt>rss|atom)/$', syndication.feed_view,
+            {'kind': 'index'}, name='index_feed'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    re_path(r'^group/(?P<slug>[-\w]+)/(?P<fmt>rss|atom)/$',
+            syndication.feed_view, {'kind': 'group'}, name='group_feed'),
+    path('search/', views.search_posts, name='search'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/export.jsonl', views.profile_export,
+         name='profile_export'),
+    re_path(r'^profile/(?P<username>[^/]+)/(?P<fmt>rss|atom)/$',
+            syndication.feed_view, {'kind': 'profile'}, name='profile_feed'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='update_post'),
@@ -26,6 +35,18 @@ urlpatterns = [
          ),
     path('posts/<int:post_id>/delete/', views.post_delete, name='delete_post'),
     path('create_group/', views.group_create, name='group_create'),
+    path('groups/autocomplete/', views.group_autocomplete,
+         name='group_autocomplete'),
+    path('api/v1/posts/', api.posts, name='api_posts'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/v1/posts/<int:post_id>/comments/', api.comments,
+         name='api_comments'),
+    path('api/v1/groups/<slug:slug>/posts/', api.group_posts,
+         name='api_group_posts'),
+    path('api/v1/profiles/<str:username>/posts/', api.profile_posts,
+         name='api_profile_posts'),
+    path('api/v1/follow/', api.follow_feed, name='api_follow'),
 ]
 
 if settings.DEBUG:
@@ -1,25 +1,38 @@
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 
+from core.paginator import CachedCountPaginator
+from posts.counters import post_count_key, user_stats
+from posts import export, group_index, search, thumbnails
+from posts.feeds import follow_paginator
 from posts.models import Post, Group, User, Follow
 from posts.forms import PostForm, CommentForm, GroupForm
 
 
-def get_page_obj(page_number, posts, limit):
-    paginator = Paginator(posts, limit)
-    return paginator.get_page(page_number)
+def paginate(request, paginator):
+    """Return the page picked by ``?after=`` / ``?before=`` or ``?page=``."""
+    return paginator.get_page(request.GET.get('page'),
+                              after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+
+
+def get_page_obj(request, posts, limit, **kwargs):
+    return paginate(request, CachedCountPaginator(posts, limit, **kwargs))
 
 
 def index(request):
     """Represents index.html"""
     template = 'posts/index.html'
     posts = Post.objects.select_related('author', 'group')
-    page_obj = get_page_obj(request.GET.get('page'),
-                            posts, settings.POST_LIM)
+    page_obj = get_page_obj(request,
+                            posts, settings.POST_LIM,
+                            count_key=post_count_key('index'))
     context = {
         'page_obj': page_obj,
+        'cache_tags': ['feed:index', 'groups', 'users'],
     }
     return render(request, template, context)
 
@@ -29,10 +42,41 @@ def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author')
-    page_obj = get_page_obj(request.GET.get('page'), posts, settings.POST_LIM)
+    page_obj = get_page_obj(request, posts, settings.POST_LIM,
+                            count_key=post_count_key('group', group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_tags': [f'group:{group.pk}', 'users'],
+    }
+    return render(request, template, context)
+
+
+def group_autocomplete(request):
+    """Groups whose title or slug starts with ?q=, for the group picker."""
+    results = group_index.search(request.GET.get('q', ''))
+    return JsonResponse(
+        {'results': [{'id': pk, 'text': title} for pk, title in results]})
+
+
+def search_posts(request):
+    """Represents search/?q= with posts ranked by relevance."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page = search.search(query, settings.POST_LIM,
+                         after=request.GET.get('after'))
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [result.pk for result in page.results])
+    results = []
+    for result in page.results:
+        post = posts.get(result.pk)
+        if post is not None:
+            post.snippet = result.snippet
+            results.append(post)
+    context = {
+        'query': query,
+        'results': results,
+        'next_cursor': page.next_cursor,
     }
     return render(request, template, context)
 
@@ -40,29 +84,57 @@ def group_posts(request, slug):
 def profile(request, username):
     """Represents author profile with all posts and number of posts"""
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = user_stats(author)
     posts = author.posts.select_related('group')
-    page_obj = get_page_obj(request.GET.get('page'),
-                            posts, settings.POST_LIM)
+    page_obj = get_page_obj(request,
+                            posts, settings.POST_LIM,
+                            total=stats.posts_count)
     following = (request.user.is_authenticated
                  and author.following.filter(user=request.user).exists())
     context = {
         'page_obj': page_obj,
         'author': author,
+        'stats': stats,
         'following': following,
+        'cache_tags': [f'author:{author.pk}', 'groups', 'users'],
     }
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    """Streams the author's posts with their comments as JSON lines,
+    gzipped for clients that accept it. Only the author may export."""
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    content = export.encoded(export.export_lines(author))
+    compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if compress:
+        content = export.gzipped(content)
+    response = StreamingHttpResponse(content,
+                                     content_type='application/x-ndjson')
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.jsonl"')
+    return response
+
+
 def post_detail(request, post_id):
     """Represents post with information about author and group"""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post.objects.prefetch_related(
-        'author', 'group'), pk=post_id)
+    post = get_object_or_404(Post.objects.select_related(
+        'author__stats', 'group'), pk=post_id)
     context = {
         'post': post,
+        'stats': user_stats(post.author),
         'form': CommentForm(),
-        'comments': post.comments.select_related('author')
+        'comments': post.comments.select_related('author').order_by(
+            'created', 'pk')
     }
     return render(request, template, context)
 
@@ -78,6 +150,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.enqueue(post)
         return redirect('posts:profile', post.author.username)
     return render(request, template, {'form': form})
 
@@ -108,6 +181,8 @@ def post_edit(request, post_id):
                     files=request.FILES or None,)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post)
         return redirect('posts:post_detail', post_id)
     return render(request,
                   template,
@@ -138,10 +213,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.select_related(
-        'author', 'group').filter(author__following__user=request.user)
-    page_obj = get_page_obj(request.GET.get('page'),
-                            posts, settings.POST_LIM)
+    page_obj = paginate(request,
+                        follow_paginator(request.user, settings.POST_LIM))
     context = {
         'page_obj': page_obj,
     }
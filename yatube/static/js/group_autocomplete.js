@@ -0,0 +1,38 @@
+// Fills selects marked with data-autocomplete-url with matching options
+// while the user types into a search box placed in front of them.
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control mb-1';
+    input.placeholder = 'Начните вводить название группы';
+    select.parentNode.insertBefore(input, select);
+
+    var timer = null;
+    var request = 0;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var current = ++request;
+        var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (data) {
+          if (current !== request) {
+            return;
+          }
+          Array.from(select.options).forEach(function (option) {
+            if (option.value && !option.selected) {
+              option.remove();
+            }
+          });
+          data.results.forEach(function (group) {
+            if (!select.querySelector('option[value="' + group.id + '"]')) {
+              select.add(new Option(group.text, group.id));
+            }
+          });
+        });
+      }, 200);
+    });
+  });
+});
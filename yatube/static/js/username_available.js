@@ -0,0 +1,40 @@
+// Tells whether the username typed into an input marked with
+// data-available-url is still free, before the form is submitted.
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('input[data-available-url]').forEach(function (input) {
+    var hint = document.createElement('small');
+    hint.className = 'form-text';
+    input.parentNode.insertBefore(hint, input.nextSibling);
+
+    var timer = null;
+    var request = 0;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      hint.textContent = '';
+      if (!input.value) {
+        return;
+      }
+      timer = setTimeout(function () {
+        var current = ++request;
+        var url = input.dataset.availableUrl + '?username=' + encodeURIComponent(input.value);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (data) {
+          if (current !== request) {
+            return;
+          }
+          if (data.errors) {
+            hint.className = 'form-text text-danger';
+            hint.textContent = data.errors.join(' ');
+          } else if (data.available) {
+            hint.className = 'form-text text-success';
+            hint.textContent = 'Имя свободно';
+          } else {
+            hint.className = 'form-text text-danger';
+            hint.textContent = 'Имя уже занято';
+          }
+        });
+      }, 300);
+    });
+  });
+});
@@ -1,5 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
+from django.template import loader
+from django.urls import reverse_lazy
+
+from .tasks import send_email
 
 
 User = get_user_model()
@@ -10,3 +14,25 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+    class Media:
+        js = ('js/username_available.js',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['username'].widget.attrs['data-available-url'] = (
+            reverse_lazy('users:username_available'))
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Password reset form that leaves sending the mail to a worker"""
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html = None
+        if html_email_template_name is not None:
+            html = loader.render_to_string(html_email_template_name, context)
+        send_email.enqueue(subject, body, from_email, [to_email], html)
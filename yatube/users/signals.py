@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from . import usernames
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields, **kwargs):
+    """Keep the stored username, so only renames reach the filter."""
+    instance._stored_username = None
+    if instance.pk is not None and (update_fields is None
+                                    or 'username' in update_fields):
+        instance._stored_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created or (
+            getattr(instance, '_stored_username', None) is not None
+            and instance._stored_username != instance.username):
+        usernames.add(instance.username)
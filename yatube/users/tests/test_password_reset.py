@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+
+User = get_user_model()
+
+
+class PasswordResetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(username='user', email='user@example.com',
+                                 password='secret')
+
+    def test_mail_is_sent_by_worker(self):
+        response = Client().post(reverse('users:password_reset'),
+                                 {'email': 'user@example.com'})
+        self.assertRedirects(response, reverse('password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.get().name, 'users.tasks.send_email')
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
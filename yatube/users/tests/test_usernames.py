@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import cache_tags
+from users import usernames
+
+User = get_user_model()
+
+
+class UsernameAvailableTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(username='taken')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('users:username_available')
+
+    def check(self, username):
+        return self.client.get(self.url, {'username': username}).json()
+
+    def test_taken_and_free(self):
+        self.assertEqual(self.check('taken'), {'available': False})
+        self.assertEqual(self.check('free'), {'available': True})
+
+    def test_free_name_skips_database(self):
+        usernames.get_filter()
+        with self.assertNumQueries(0):
+            self.assertFalse(usernames.is_taken('free'))
+
+    def test_invalid_name(self):
+        response = self.check('no spaces')
+        self.assertFalse(response['available'])
+        self.assertTrue(response['errors'])
+        self.assertEqual(self.check(''), {'available': False})
+
+    def test_new_user_is_added_without_rebuild(self):
+        bloom = usernames.get_filter()
+        User.objects.create_user(username='newcomer')
+        self.assertIs(usernames.get_filter(), bloom)
+        self.assertEqual(self.check('newcomer'), {'available': False})
+
+    def test_users_of_other_processes_rebuild_filter(self):
+        bloom = usernames.get_filter()
+        User.objects.filter(username='taken').update(username='elsewhere')
+        cache_tags.bump('usernames')
+        self.assertIsNot(usernames.get_filter(), bloom)
+        self.assertEqual(self.check('elsewhere'), {'available': False})
+
+    def test_names_of_other_processes_are_added_from_log(self):
+        bloom = usernames.get_filter()
+        # Created by a worker whose filter is in another process.
+        with mock.patch.object(usernames, '_filter', None), \
+                mock.patch.object(usernames, '_version', None):
+            User.objects.create_user(username='remote')
+        self.assertIs(usernames.get_filter(), bloom)
+        self.assertIn('remote', bloom)
+
+    def test_only_new_names_bump_the_tag(self):
+        user = User.objects.get(username='taken')
+        version = cache_tags.get_versions(['usernames'])
+        user.first_name = 'Лев'
+        user.save()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(cache_tags.get_versions(['usernames']), version)
+        bloom = usernames.get_filter()
+        user.username = 'renamed'
+        user.save()
+        self.assertNotEqual(cache_tags.get_versions(['usernames']), version)
+        self.assertIs(usernames.get_filter(), bloom)
+        self.assertEqual(self.check('renamed'), {'available': False})
+
+    def test_signup_page_hooks_the_check(self):
+        response = self.client.get(reverse('users:signup'))
+        self.assertContains(response, 'data-available-url="/auth/'
+                                      'username-available/"')
+        self.assertContains(response, 'js/username_available.js')
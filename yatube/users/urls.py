@@ -10,6 +10,7 @@ from django.contrib.auth.views import (LoginView,
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -26,6 +27,11 @@ urlpatterns = [
         name='logout'
     ),
     path('signup/', views.SignUp.as_view(), name='signup'),
+    path(
+        'username-available/',
+        views.username_available,
+        name='username_available'
+    ),
     path
         (
         'password_change/',
@@ -46,7 +52,8 @@ urlpatterns = [
     path(
         'password_reset/',
         PasswordResetView.as_view(
-            template_name='users/password_reset_form.html'
+            template_name='users/password_reset_form.html',
+            form_class=QueuedPasswordResetForm
         ),
         name='password_reset'
     ),
@@ -0,0 +1,97 @@
+"""Username availability answered from an in-process Bloom filter.
+
+The filter holds every ``User.username``, so a name it does not contain
+is certainly free and only possible positives are checked against the
+database. Bloom filters cannot forget, so renamed and deleted users
+merely cost an extra query.
+
+Each process builds its filter on first use and adds names of users it
+creates or renames itself. Those names also bump the ``usernames``
+cache tag and are logged in the cache under the new tag version; a
+process that finds the tag moved by anyone else adds the logged names
+to its filter, and rebuilds it when the log has a gap, so users created
+by other workers are never reported free.
+"""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core import cache_tags
+from core.bloom import BloomFilter
+
+User = get_user_model()
+
+# The filter is sized for this many times the current number of users
+# and rebuilt once it holds more names than it was sized for.
+HEADROOM = 2
+MIN_CAPACITY = 1024
+ERROR_RATE = 0.01
+# Names added by other processes that are caught up with from the log
+# instead of rebuilding the filter.
+LOG_SIZE = 100
+LOG_TIMEOUT = 3600
+
+_filter = None
+_version = None
+_lock = threading.Lock()
+
+
+def build(version):
+    global _filter, _version
+    names = list(User.objects.values_list('username', flat=True))
+    bloom = BloomFilter(max(len(names) * HEADROOM, MIN_CAPACITY), ERROR_RATE)
+    bloom.update(names)
+    _filter, _version = bloom, version
+    return bloom
+
+
+def log_key(version):
+    return f'usernames:added:{version}'
+
+
+def catch_up(version):
+    """Add the names logged since our version; return whether the log
+    had them all."""
+    global _version
+    if not 0 < version - _version <= LOG_SIZE:
+        return False
+    keys = [log_key(v) for v in range(_version + 1, version + 1)]
+    names = cache.get_many(keys)
+    if len(names) < len(keys):
+        return False
+    _filter.update(names.values())
+    _version = version
+    return True
+
+
+def get_filter():
+    version, = cache_tags.get_versions(['usernames'])
+    with _lock:
+        stale = _filter is None or (
+            _version != version and not catch_up(version))
+        if stale or _filter.count > _filter.capacity:
+            return build(version)
+        return _filter
+
+
+def add(username):
+    """Record ``username`` as taken here and in every other process."""
+    global _version
+    with _lock:
+        if _filter is not None:
+            _filter.add(username)
+        try:
+            version = cache.incr(cache_tags.tag_key('usernames'))
+        except ValueError:
+            cache_tags.bump('usernames')
+            return
+        cache.set(log_key(version), username, LOG_TIMEOUT)
+        # Keep our filter if nobody else added a name since it was built.
+        if _version is not None and version == _version + 1:
+            _version = version
+
+
+def is_taken(username):
+    return username in get_filter() and User.objects.filter(
+        username=username).exists()
@@ -1,12 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
 
-
+from . import usernames
 from .forms import CreationForm
 
+User = get_user_model()
+
 
 class SignUp(CreateView):
     """Registration view"""
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+def username_available(request):
+    """Tells the signup form whether ?username= is still free."""
+    username = request.GET.get('username', '')
+    field = User._meta.get_field('username')
+    try:
+        field.run_validators(username)
+    except ValidationError as error:
+        return JsonResponse({'available': False, 'errors': error.messages})
+    return JsonResponse({'available': bool(username)
+                         and not usernames.is_taken(username)})
@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -61,6 +65,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.cache_sync_middleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -92,9 +97,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep connections, and the pragmas and page cache that come
+        # with them, instead of reopening the file on every request.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Applied to every new SQLite connection, see core/db.py. cache_size is
+# in KiB when negative; busy_timeout is in milliseconds and comes first
+# so that switching the journal mode waits for locks too.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,8 +156,43 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded post images are shrunk and re-encoded (JPEG or WEBP) on save,
+# see core/images.py.
+IMAGE_UPLOAD_MAX_SIDE = 2048
+IMAGE_UPLOAD_FORMAT = 'JPEG'
+IMAGE_UPLOAD_QUALITY = 85
+# Seconds an unreferenced image is kept after an upload of the same
+# content reused it, so the uploading post can commit; see
+# posts.thumbnails.release.
+IMAGE_RELEASE_GRACE = 600
+
+# Disk cache of images resized by /media/r/... URLs, see core/images.py.
+IMAGE_RESIZE_ROOT = os.path.join(MEDIA_ROOT, 'resized')
+IMAGE_RESIZE_QUALITY = 85
+# URL prefix of IMAGE_RESIZE_ROOT in an nginx internal location; when
+# set, resized images are sent by nginx through X-Accel-Redirect.
+IMAGE_RESIZE_ACCEL_REDIRECT = None
+
 POST_LIM = 10
 
+# Newest entries kept in each materialized follow feed and in each
+# author's cached list of recent posts.
+TIMELINE_LIM = 1000
+
+# How follow_index is built: 'timeline' (fan-out-on-write) or 'pull'
+# (merge of per-author recent posts), see posts/feeds.py.
+FOLLOW_FEED_ENGINE = 'timeline'
+
+# Background tasks run by manage.py run_workers, see core/tasks.py.
+# Failed tasks are retried after TASKS_RETRY_DELAY seconds, doubled on
+# every attempt up to TASKS_MAX_RETRY_DELAY; a task whose worker has not
+# finished it within TASKS_LEASE seconds is handed to another worker.
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_MAX_RETRY_DELAY = 3600
+TASKS_LEASE = 600
+TASKS_CLAIM_BATCH = 10
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index
@@ -148,11 +203,39 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Test runs (manage.py test, pytest) must not share state with the
+# development server.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# File of the cache shared by all worker processes on the host; test
+# runs get a throwaway one.
+if TESTING:
+    _TEST_CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, _TEST_CACHE_DIR, ignore_errors=True)
+    CACHE_PATH = os.path.join(_TEST_CACHE_DIR, 'cache.sqlite3')
+else:
+    CACHE_PATH = os.environ.get('YATUBE_CACHE_PATH',
+                                os.path.join(BASE_DIR, 'cache.sqlite3'))
+
+# In-process L1 in front of a cache shared by all worker processes on
+# the host, see core/cache_backends.py.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': 'default',
         'KEY_PREFIX': 'index_page',
-    }
+        'OPTIONS': {
+            'L2': 'shared',
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_PATH,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
 INTERNAL_IPS = [
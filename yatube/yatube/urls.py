@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 
+from core.views import resized_image
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
@@ -12,6 +14,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path(f'{settings.MEDIA_URL.lstrip("/")}r/<sig>/<int:width>x<int:height>/'
+         '<mode>/<path:name>', resized_image, name='resized_image'),
 ]
 
 if settings.DEBUG: